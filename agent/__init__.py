@@ -1,8 +1,8 @@
 from .database_agent import create_database_agent
 from .visualization_agent import create_visualization_agent
 from .human_agent import create_human_agent
-from .dataanalsys_agent import create_data_analysis_agent
+from .dataanalsys_agent import create_data_analysis_agent, SESSION_KERNEL_NOTE
 from .code_excuter_agent import create_code_exuter_agent
 
 __all__ = ['create_database_agent', 'create_visualization_agent', 'create_human_agent',
-           'create_data_analysis_agent', 'create_code_exuter_agent']
+           'create_data_analysis_agent', 'create_code_exuter_agent', 'SESSION_KERNEL_NOTE']
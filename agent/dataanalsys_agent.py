@@ -1,6 +1,32 @@
+from typing import Dict, Optional
+
 from autogen_agentchat.agents import AssistantAgent
 
-def create_data_analysis_agent(openai_client):
+INSTALL_FIRST_INSTRUCTION = (
+    'You will be give a task and you should first install the depended library using Shell scipt  cmd ex: ```bash\npip install pandas matplotlib \n```  '
+)
+
+
+def _environment_instruction(installed_packages: Optional[Dict[str, str]]) -> str:
+    """Tell the model what the executor's venv already has so it skips the pip install turn"""
+    if not installed_packages:
+        return INSTALL_FIRST_INSTRUCTION
+    listed = ', '.join(f'{name}=={version}' for name, version in sorted(installed_packages.items()))
+    return (
+        f'The Python environment already has these libraries, and their dependencies, installed: {listed}. '
+        'Do not install them; go straight to the Python code. '
+        'Only for a library that is not in this list, first give a ```bash\npip install <library>\n``` block. '
+    )
+
+
+# Appended to the task, not the system message: only session requests run on a kernel that keeps state
+SESSION_KERNEL_NOTE = (
+    '. Code runs in a persistent Python kernel: variables, imports and loaded dataframes stay available in later code blocks, '
+    'so read the file once and reuse it instead of reloading it'
+)
+
+
+def create_data_analysis_agent(openai_client, installed_packages: Optional[Dict[str, str]] = None):
     """Create database agent with SQL capabilities"""
     return AssistantAgent(
     name='DataAnalysisExpert',
@@ -8,7 +34,7 @@ def create_data_analysis_agent(openai_client):
     model_client=openai_client,
     system_message='You are a data Analysis agent that is an expert in give insigne and Answer qustion by Understand given Data,' \
     'You will be working with code executor agent to execute code' \
-    'You will be give a task and you should first install the depended library using Shell scipt  cmd ex: ```bash\npip install pandas matplotlib \n```  ' \
+    + _environment_instruction(installed_packages) + \
     'Then you should give the code in Python Block format so that it can be ran by code executor agent' \
     'You can provide Shell scipt as well if code fails due to missing libraries, make sure to use pip install command' \
     'You Mush only give a single code block and pass it to executor agent ethither bash or python black, Dont pass both at onces  '\
@@ -18,8 +44,5 @@ def create_data_analysis_agent(openai_client):
     'if you have to save the file, save it with output.png or output.txt or output.gif' \
     'Once everything is done, you should explain the results and say "STOP" to stop the conversation' \
     'Always use print see the ouput' \
-    
-)
-
-
 
+)
@@ -1,11 +1,17 @@
 from autogen_agentchat.agents import AssistantAgent
 
+DATABASE_SYSTEM_MESSAGE = (
+    "Your task is convert the user query into SQL query and return Data, Respond with 'TERMINATE' if the task is completed. "
+    "When the query comes with a 'Relevant schema' section, write the SQL from it and call sql_db_query directly; "
+    "only list tables or fetch schema when a table or column you need is missing from it"
+)
+
 def create_database_agent(model_client, db_tools):
     """Create database agent with SQL capabilities"""
     return AssistantAgent(
         "Database_enginer",
         model_client=model_client,
         tools=db_tools,
-        system_message="Your task is convert the user query into SQL query and return Data, Respond with 'TERMINATE' if the task is completed",
+        system_message=DATABASE_SYSTEM_MESSAGE,
         description="This agent handles database queries and data retrieval and convert the text into sql which have access to Database"
     )
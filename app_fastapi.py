@@ -21,37 +21,65 @@ Architecture:
 import os
 import json
 import asyncio
+import mimetypes
 import logging
 import traceback
+import tempfile
+import time
+from contextlib import asynccontextmanager
 from datetime import datetime
 from pathlib import Path
 from typing import Dict, Any, Optional, List
+from urllib.parse import quote
 import threading
 
 from fastapi import FastAPI, HTTPException, File, UploadFile, Form, Depends, BackgroundTasks, Request
-from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from pydantic import BaseModel, Field
 import uvicorn
+from autogen_core import CancellationToken
 
 # Import AutoInsight AI components
 from teams.team_manager import TeamManager
+from teams.team_pool import TeamPool
+from teams.session_registry import SessionRegistry
 from agent import (
     create_database_agent, 
     create_visualization_agent,
     create_data_analysis_agent,
     create_code_exuter_agent,
-    create_human_agent
+    create_human_agent,
+    SESSION_KERNEL_NOTE
 )
 from database import DatabaseManager
-from config import get_openai_client, load_environment
+from config import (
+    get_openai_client, load_environment, get_team_pool_size, get_session_settings,
+    get_embedding_function, get_query_cache_settings, get_sql_result_settings
+)
 from tool import (
     create_bar_chart, create_line_chart, create_histogram,
-    create_scatter_plot, create_pie_chart, create_docker_cmd_code_excuter
+    create_scatter_plot, create_pie_chart
+)
+from tool.sql_tool_kit import sql_result_cache
+from tool.direct_chart import ChartInferenceError, create_chart_direct, visualization_latency
+from tool.plot_results import PlotArtifact, PlotResultChannel, current_plot_results, plot_tools
+from tool.docker_executer import code_environment
+from tool.executor_pool import PooledCodeExecutor, current_code_executor, executor_pool
+from tool.kernel_executor import kernel_sessions
+from tool.run_workspaces import run_workspaces
+from tool.render_pool import render_pool
+from tool.render_cache import render_cache
+from tool.render_profiles import current_render_profile, resolve_profile
+from tool.sql_result import sql_result_store
+from tool.sql_cursor import result_handles
+from tool.query_limits import QueryLimits, current_query_limits
+from util import (
+    stream_db_conversation,
+    QueryCache, replay_events, schema_fingerprint, sqlite_path_from_uri
 )
-from util import stream_db_conversation, display_plot_result
 
 # Configure logging
 logging.basicConfig(
@@ -67,16 +95,22 @@ logger = logging.getLogger(__name__)
 # Pydantic models for request/response validation
 class DatabaseQueryRequest(BaseModel):
     query: str = Field(..., description="Natural language database query")
-    reset_context: bool = Field(True, description="Whether to reset conversation context")
+    reset_context: bool = Field(False, description="Clear the session's conversation context before this query; by default a session keeps it")
+    session_id: Optional[str] = Field(None, description="Client session id; keeps conversation context across requests")
 
 class VisualizationRequest(BaseModel):
     data: Optional[str] = Field(None, description="Data to visualize as string (JSON, CSV, or raw text)")
     query: str = Field(..., description="Visualization request description")
     chart_type: Optional[str] = Field(None, description="Preferred chart type")
+    result_id: Optional[str] = Field(None, description="Id of a stored database query result to visualize instead of data")
+    profile: Optional[str] = Field(None, description="Render profile: preview (96 dpi WebP), report (300 dpi PNG), vector (SVG) or interactive (Plotly JSON returned inline)")
+    format: Optional[str] = Field(None, description="Output format override within the profile: webp/png, png/webp, svg/pdf or plotly")
+    thumbnail: Optional[bool] = Field(None, description="Also write a small PNG thumbnail next to the chart")
 
 class DataAnalysisRequest(BaseModel):
     filename: str = Field(..., description="Name of the file to analyze")
     task: str = Field(..., description="Analysis task description")
+    session_id: Optional[str] = Field(None, description="Client session id; keeps the analysis kernel, and the data loaded in it, across requests")
 
 class TeamResetRequest(BaseModel):
     team: str = Field("all", description="Team to reset: all, database, visualization, data_analysis")
@@ -131,11 +165,27 @@ templates = Jinja2Templates(directory=TEMPLATES_FOLDER)
 # Global variables for teams and services
 team_manager: Optional[TeamManager] = None
 database_manager: Optional[DatabaseManager] = None
-database_team = None
-visualization_team = None
-data_analysis_team = None
+database_pool: Optional[TeamPool] = None
+visualization_pool: Optional[TeamPool] = None
+data_analysis_pool: Optional[TeamPool] = None
+database_sessions: Optional[SessionRegistry] = None
+query_cache: Optional[QueryCache] = None
 initialization_lock = threading.Lock()
 initialized = False
+# Strong references to fire-and-forget tasks so they aren't collected mid-run
+_background_tasks = set()
+
+def _task_done(task: asyncio.Task):
+    _background_tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logger.error(f"Background task {task.get_name()} failed", exc_info=task.exception())
+
+def spawn_background(coro, name: str) -> asyncio.Task:
+    """Run a coroutine in the background, keeping it referenced, logging its failure and cancelling it at shutdown"""
+    task = asyncio.create_task(coro, name=name)
+    _background_tasks.add(task)
+    task.add_done_callback(_task_done)
+    return task
 
 class AutoInsightServer:
     """Main server class managing all agent teams and operations"""
@@ -143,7 +193,7 @@ class AutoInsightServer:
     @staticmethod
     async def initialize_services():
         """Initialize all AI services and teams"""
-        global team_manager, database_manager, database_team, visualization_team, data_analysis_team, initialized
+        global team_manager, database_manager, database_pool, visualization_pool, data_analysis_pool, database_sessions, query_cache, initialized
         
         with initialization_lock:
             if initialized:
@@ -165,42 +215,63 @@ class AutoInsightServer:
                 # Get OpenAI client
                 openai_client = get_openai_client()
                 
-                # Create database team
-                database_team = team_manager.create_db_team(
-                    create_database_agent(
-                        openai_client,
-                        database_manager.get_tools()
-                    )
-                )
+                pool_size = get_team_pool_size()
                 
-                # Create visualization team
-                visualization_team = team_manager.create_visualization_team(
-                    create_visualization_agent(
-                        openai_client,
-                        [
-                            create_line_chart, create_pie_chart, create_scatter_plot,
-                            create_histogram, create_bar_chart
-                        ]
+                # Database team pool
+                def build_database_team():
+                    return team_manager.create_db_team(
+                        create_database_agent(
+                            openai_client,
+                            database_manager.get_tools()
+                        )
                     )
-                )
                 
-                # Create data analysis team
-                docker = create_docker_cmd_code_excuter()
-                code_executor_agent = create_code_exuter_agent(docker=docker)
-                data_analysis_expert = create_data_analysis_agent(openai_client=openai_client)
+                # Visualization team pool
+                def build_visualization_team():
+                    return team_manager.create_visualization_team(
+                        create_visualization_agent(
+                            openai_client,
+                            plot_tools(
+                                create_line_chart, create_pie_chart, create_scatter_plot,
+                                create_histogram, create_bar_chart
+                            )
+                        )
+                    )
                 
                 # Human agent with server-compatible input function
                 def server_human_input(prompt):
                     logger.info(f"Human input requested: {prompt}")
                     return "Approved by server"  # Auto-approve for server mode
                 
-                human_agent = create_human_agent(Input_funtion=server_human_input)
+                # Data analysis team pool
+                def build_data_analysis_team():
+                    # Code runs on the executor leased from executor_pool for each request
+                    docker = PooledCodeExecutor()
+                    return team_manager.create_data_analysis_team(
+                        openai_client=openai_client,
+                        DataAnalysisExpert=create_data_analysis_agent(
+                            openai_client=openai_client, installed_packages=code_environment.analysis_packages()
+                        ),
+                        code_executor_agent=create_code_exuter_agent(docker=docker),
+                        human_agent=create_human_agent(Input_funtion=server_human_input)
+                    )
+                
+                database_pool = TeamPool("database", build_database_team, size=pool_size)
+                visualization_pool = TeamPool("visualization", build_visualization_team, size=pool_size)
+                data_analysis_pool = TeamPool("data_analysis", build_data_analysis_team, size=pool_size)
+                for pool in (database_pool, visualization_pool, data_analysis_pool):
+                    pool.warm()
+                
+                # Conversations that carry context across requests get their own team
+                database_sessions = SessionRegistry("database", build_database_team, **get_session_settings())
                 
-                data_analysis_team = team_manager.create_data_analysis_team(
-                    openai_client=openai_client,
-                    DataAnalysisExpert=data_analysis_expert,
-                    code_executor_agent=code_executor_agent,
-                    human_agent=human_agent
+                # Answers to repeated questions are replayed instead of re-running the agent
+                cache_settings = get_query_cache_settings()
+                query_cache = QueryCache(
+                    max_entries=cache_settings["max_entries"],
+                    ttl=cache_settings["ttl"],
+                    embed_fn=get_embedding_function() if cache_settings["semantic"] else None,
+                    similarity_threshold=cache_settings["similarity_threshold"]
                 )
                 
                 initialized = True
@@ -221,7 +292,37 @@ async def ensure_initialized():
 @app.on_event("startup")
 async def startup_event():
     """Initialize services on startup"""
+    started = time.perf_counter()
+    # Built in the background; analyses wait for it only if they arrive before it's done
+    code_environment.provision_in_background()
+    # Executors start once the environment is ready; the first lease waits for them if needed
+    spawn_background(executor_pool.start(), "executor-pool-start")
     await AutoInsightServer.initialize_services()
+    services_ready = time.perf_counter()
+    spawn_background(database_sessions.run_reaper(), "database-session-reaper")
+    if kernel_sessions is not None:
+        spawn_background(kernel_sessions.run_reaper(), "kernel-session-reaper")
+    spawn_background(run_workspaces.run_reaper(), "run-workspace-reaper")
+    # Workers are spawned and warmed now so the first chart doesn't pay for it
+    await asyncio.to_thread(render_pool.start)
+    render_pool_ready = time.perf_counter()
+    logger.info(
+        f"Startup phases: services {(services_ready - started) * 1000:.1f} ms, "
+        f"render pool {(render_pool_ready - services_ready) * 1000:.1f} ms "
+        f"(code environment provisioning continues in the background)"
+    )
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop background tasks, chart render workers, analysis kernels and code executors"""
+    tasks = list(_background_tasks)
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    render_pool.shutdown()
+    if kernel_sessions is not None:
+        await kernel_sessions.shutdown()
+    await executor_pool.shutdown()
 
 # Helper functions for streaming
 async def stream_json_response(data_generator, request_info: dict):
@@ -284,9 +385,9 @@ async def health_check():
                 "initialized": initialized,
                 "database": database_manager is not None,
                 "teams": {
-                    "database_team": database_team is not None,
-                    "visualization_team": visualization_team is not None,
-                    "data_analysis_team": data_analysis_team is not None
+                    "database_team": database_pool is not None,
+                    "visualization_team": visualization_pool is not None,
+                    "data_analysis_team": data_analysis_pool is not None
                 }
             }
         )
@@ -295,6 +396,33 @@ async def health_check():
         logger.error(f"Health check failed: {str(e)}")
         raise HTTPException(status_code=500, detail={"status": "unhealthy", "error": str(e)})
 
+@app.get("/api/v1/metrics")
+async def get_metrics():
+    """Runtime metrics for team pools"""
+    return {
+        "timestamp": datetime.now().isoformat(),
+        "pools": {
+            pool.name: pool.metrics()
+            for pool in (database_pool, visualization_pool, data_analysis_pool)
+            if pool is not None
+        },
+        "sessions": {
+            "database": database_sessions.metrics() if database_sessions else None
+        },
+        "query_cache": query_cache.metrics() if query_cache else None,
+        "sql_result_cache": sql_result_cache.metrics(),
+        "sql_result_store": sql_result_store.metrics(),
+        "sql_result_handles": result_handles.metrics(),
+        "database": database_manager.metrics() if database_manager else None,
+        "render_pool": render_pool.metrics(),
+        "render_cache": render_cache.metrics(),
+        "visualization_latency": visualization_latency.metrics(),
+        "code_environment": code_environment.metrics(),
+        "executor_pool": executor_pool.metrics(),
+        "kernels": kernel_sessions.metrics() if kernel_sessions else None,
+        "run_workspaces": run_workspaces.metrics()
+    }
+
 @app.post("/api/v1/database/query")
 async def database_query_stream(request: DatabaseQueryRequest, _: None = Depends(ensure_initialized)):
     """
@@ -303,26 +431,74 @@ async def database_query_stream(request: DatabaseQueryRequest, _: None = Depends
     try:
         logger.info(f"Processing database query: {request.query}")
         
+        if request.session_id:
+            try:
+                SessionRegistry.validate_session_id(request.session_id)
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+            # Session teams keep their context unless the client asks for a reset
+            team_lease = database_sessions.acquire(request.session_id)
+        else:
+            team_lease = database_pool.lease()
+        
+        # Only stateless questions are cacheable; session answers depend on prior turns
+        cacheable = not request.session_id
+        fingerprint = None
+        if cacheable:
+            fingerprint = schema_fingerprint(sqlite_path_from_uri(database_manager.db_uri))
+            cached_events = await query_cache.lookup(request.query, fingerprint)
+            if cached_events is not None:
+                logger.info(f"Query cache hit: {request.query}")
+                return StreamingResponse(
+                    stream_json_response(
+                        replay_events(cached_events),
+                        {'query': request.query, 'operation': 'database_query', 'cached': True}
+                    ),
+                    media_type="text/plain",
+                    headers={"Cache-Control": "no-cache", "Connection": "keep-alive"}
+                )
+        
         async def generate_database_response():
+            # Cancelling the token stops the agent; the limits abort any SQL it has in flight
+            cancellation_token = CancellationToken()
+            result_settings = get_sql_result_settings()
+            limits = QueryLimits(
+                timeout=result_settings["query_timeout"],
+                max_rows=result_settings["max_rows"]
+            ).bind(cancellation_token)
+            # Set before run_stream so the agent runtime's tasks and tool threads inherit it
+            current_query_limits.set(limits)
             try:
-                if request.reset_context:
-                    await database_team.reset()
-                
-                result = database_team.run_stream(task=request.query)
                 final_result = None
-                
-                async for message in stream_db_conversation(result):
-                    yield message
-                    if isinstance(message, dict) and message.get('type') == 'tool_result' and 'data' in message:
-                        final_result = message['data']
+                events = []
+                async with team_lease as database_team:
+                    if request.session_id and request.reset_context:
+                        await database_team.reset()
+                    
+                    # The relevant schema goes into the first turn, saving the agent's discovery round trips
+                    task = await asyncio.to_thread(database_manager.build_task, request.query)
+                    result = database_team.run_stream(task=task, cancellation_token=cancellation_token)
+                    
+                    async for message in stream_db_conversation(result):
+                        # Non-dict messages are sent as their string form, so cache that
+                        events.append(message if isinstance(message, dict) else str(message))
+                        yield message
+                        if isinstance(message, dict) and message.get('type') == 'tool_result' and 'data' in message:
+                            # Preview only; the full result is fetched by result_id
+                            final_result = {**message['data'], 'url': message['url']}
                 
                 # Send final result summary
                 if final_result:
-                    yield {
+                    summary = {
                         'type': 'final_result',
                         'data': final_result,
                         'timestamp': datetime.now().isoformat()
                     }
+                    events.append(summary)
+                    yield summary
+                
+                if cacheable:
+                    await query_cache.store(request.query, fingerprint, events)
                     
             except Exception as e:
                 logger.error(f"Database query processing failed: {str(e)}")
@@ -331,20 +507,139 @@ async def database_query_stream(request: DatabaseQueryRequest, _: None = Depends
                     'error': str(e),
                     'timestamp': datetime.now().isoformat()
                 }
+            finally:
+                # Reached on completion and when the client disconnects mid-stream
+                if not cancellation_token.is_cancelled():
+                    cancellation_token.cancel()
         
         return StreamingResponse(
             stream_json_response(
                 generate_database_response(),
-                {'query': request.query, 'operation': 'database_query'}
+                {'query': request.query, 'operation': 'database_query', 'cached': False}
             ),
             media_type="text/plain",
             headers={"Cache-Control": "no-cache", "Connection": "keep-alive"}
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Database query endpoint error: {str(e)}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
+@app.get("/api/v1/database/schema")
+async def get_database_schema(_: None = Depends(ensure_initialized)):
+    """Precomputed schema catalog: tables, columns, keys, row counts, stats and samples"""
+    if database_manager.catalog is None:
+        raise HTTPException(status_code=404, detail="No schema catalog for this database")
+    return await asyncio.to_thread(database_manager.catalog.to_dict)
+
+def _arrow_response(table, headers: Optional[Dict[str, str]] = None) -> Response:
+    """Serialize a pyarrow table as an Arrow IPC stream"""
+    import pyarrow as pa
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return Response(content=sink.getvalue().to_pybytes(), media_type="application/vnd.apache.arrow.stream", headers=headers)
+
+@app.get("/api/v1/database/results/{result_id}")
+async def get_database_result(result_id: str, format: str = "json", offset: int = 0, limit: Optional[int] = None):
+    """Fetch the structured result of an agent-issued SQL query; cursor-mode results always come one page at a time"""
+    if format not in ("json", "arrow"):
+        raise HTTPException(status_code=400, detail="format must be 'json' or 'arrow'")
+    if offset < 0 or (limit is not None and not 1 <= limit <= 10000):
+        raise HTTPException(status_code=400, detail="offset must be >= 0 and limit between 1 and 10000")
+    
+    # Cursor-mode results are paged from the database instead of held in memory; without a limit the first page is served
+    handle = result_handles.get(result_id)
+    if handle is not None:
+        page = await asyncio.to_thread(handle.page, offset, limit or 100)
+        next_offset = offset + page.row_count if page.truncated else None
+        if format == "arrow":
+            headers = {'X-Offset': str(offset), 'X-Has-More': str(page.truncated).lower()}
+            if next_offset is not None:
+                headers['X-Next-Offset'] = str(next_offset)
+            return _arrow_response(page.to_arrow(), headers)
+        return {**page.to_dict(), 'offset': offset, 'has_more': page.truncated, 'next_offset': next_offset}
+    
+    result = sql_result_store.get(result_id)
+    if result is None:
+        raise HTTPException(status_code=404, detail=f"Result {result_id} not found or expired")
+    
+    if format == "arrow":
+        table = result.to_arrow()
+        if offset or limit is not None:
+            table = table.slice(offset, limit)
+        return _arrow_response(table)
+    return result.to_dict(offset, None if limit is None else offset + limit)
+
+@app.get("/api/v1/database/results/{result_id}/stream")
+async def stream_database_result(result_id: str, format: str = "ndjson"):
+    """Stream every row of a cursor-mode result as NDJSON or Arrow IPC, batch by batch"""
+    handle = result_handles.get(result_id)
+    if handle is None:
+        raise HTTPException(status_code=404, detail=f"Result {result_id} not found or expired")
+    
+    if format == "ndjson":
+        return StreamingResponse(handle.iter_ndjson(), media_type="application/x-ndjson")
+    if format == "arrow":
+        return StreamingResponse(handle.iter_arrow(), media_type="application/vnd.apache.arrow.stream")
+    raise HTTPException(status_code=400, detail="format must be 'ndjson' or 'arrow'")
+
+@app.delete("/api/v1/sessions/{session_id}")
+async def delete_session(session_id: str, _: None = Depends(ensure_initialized)):
+    """Drop a database session and any state spilled to disk"""
+    try:
+        found = await database_sessions.drop(session_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not found:
+        raise HTTPException(status_code=404, detail=f"Session {session_id} not found")
+    return {'success': True, 'session_id': session_id}
+
+async def _run_visualization_agent(context: str) -> Optional[PlotArtifact]:
+    """Let the visualization agent pick and call a plotting tool; returns the first chart it publishes"""
+    channel = PlotResultChannel()
+    # Set before run_stream so the plotting tools the agent calls publish into it
+    current_plot_results.set(channel)
+    cancellation_token = CancellationToken()
+    
+    visualization_team = await visualization_pool.checkout()
+    result = visualization_team.run_stream(task=context, cancellation_token=cancellation_token)
+    conversation = stream_db_conversation(result)
+    
+    async def drain():
+        async for message in conversation:
+            if isinstance(message, dict):
+                logger.debug(f"Received dict message: {message.get('type', 'unknown')}")
+    
+    # Whichever comes first: a rendered chart, or the agent finishing without one
+    published = asyncio.create_task(channel.wait())
+    finished = asyncio.create_task(drain())
+    
+    async def wind_down():
+        """Stop the team's remaining turns and return it to the pool once its runtime is idle"""
+        try:
+            cancellation_token.cancel()
+            finished.cancel()
+            await asyncio.gather(finished, return_exceptions=True)
+            await conversation.aclose()
+            await result.aclose()
+        except Exception as e:
+            logger.warning(f"Visualization team did not stop cleanly: {e}")
+        finally:
+            await visualization_pool.checkin(visualization_team)
+    
+    try:
+        await asyncio.wait({published, finished}, return_when=asyncio.FIRST_COMPLETED)
+        if finished.done():
+            finished.result()
+    finally:
+        published.cancel()
+        # The response goes out now; the team finishes stopping in the background before it is reused
+        spawn_background(wind_down(), "visualization-wind-down")
+    return channel.first
+
 @app.post("/api/v1/visualization/create")
 async def create_visualization(request: VisualizationRequest, _: None = Depends(ensure_initialized)):
     """
@@ -353,81 +648,72 @@ async def create_visualization(request: VisualizationRequest, _: None = Depends(
     try:
         logger.info(f"Processing visualization request: {request.query}")
         
-        # Prepare context for visualization agent
-        context = ""
-        if request.data:
-            context += f"Data to visualize: {request.data}\n"
-        if request.chart_type:
-            context += f"Preferred chart type: {request.chart_type}\n"
-        context += f"Request: {request.query}"
+        try:
+            profile = resolve_profile(request.profile, request.format, request.thumbnail)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
         
-        # Run visualization team and get result
-        result = visualization_team.run_stream(task=context)
+        # A stored query result stands in for inline data
+        if request.result_id:
+            handle = result_handles.get(request.result_id)
+            stored = (
+                await asyncio.to_thread(handle.page, 0, 10000) if handle is not None
+                else sql_result_store.get(request.result_id)
+            )
+            if stored is None:
+                raise HTTPException(status_code=404, detail=f"Result {request.result_id} not found or expired")
+            request.data = json.dumps({"columns": stored.columns, "rows": stored.rows()})
         
-        # Process the async generator following the same pattern as Streamlit
-        plot_path = None
+        # Set before any plotting call so the tools, direct or agent-called, inherit it
+        current_render_profile.set(profile)
+        started = time.perf_counter()
+        artifact = None
         
-        async for message in stream_db_conversation(result):
-            print(message)
-            if isinstance(message, dict):
-                # Handle dictionary messages (streaming conversation)
-                logger.debug(f"Received dict message: {message.get('type', 'unknown')}")
-            else:
-                # Handle final visualization result (same as Streamlit)
-                if message:
-                    # Check if this is the final message with plot results
-                    if hasattr(message, 'messages') and message.messages:
-                        # Look for ToolCallExecutionEvent in the messages
-                        from autogen_agentchat.messages import ToolCallExecutionEvent
-                        import ast
-                        
-                        for msg in message.messages:
-                            if isinstance(msg, ToolCallExecutionEvent):
-                                for content_item in msg.content:
-                                    try:
-                                        if hasattr(content_item, 'content') and content_item.content:
-                                            content_str = content_item.content
-                                            # Try to parse as literal (dictionary string)
-                                            try:
-                                                plot_result = ast.literal_eval(content_str)
-                                                if isinstance(plot_result, dict) and 'plot_path' in plot_result:
-                                                    plot_path = plot_result['plot_path']
-                                                    logger.info(f"Plot path extracted from ToolCallExecutionEvent: {plot_path}")
-                                                    break
-                                            except (ValueError, SyntaxError) as e:
-                                                logger.debug(f"Failed to parse content as literal: {e}")
-                                                continue
-                                    except Exception as e:
-                                        logger.debug(f"Error processing content item: {e}")
-                                        continue
-                            if plot_path:
-                                break
-                    
-                    # Fallback: try the original display_plot_result function
-                    if not plot_path:
-                        try:
-                            plot_path = display_plot_result(message)
-                            if plot_path:
-                                logger.info(f"Plot path extracted via display_plot_result: {plot_path}")
-                        except Exception as e:
-                            logger.debug(f"display_plot_result failed: {e}")
-                    
-                    if plot_path:
-                        break
+        # Structured data with a chart type needs no LLM: infer the columns and plot directly
+        if request.chart_type and request.data:
+            try:
+                artifact = PlotArtifact.from_result(
+                    'direct_chart', await create_chart_direct(request.chart_type, request.data, request.query)
+                )
+            except ChartInferenceError as e:
+                logger.info(f"Direct chart not possible, using the agent: {e}")
+        visualization_path = 'direct' if artifact else 'agent'
+        
+        if artifact is None:
+            # Prepare context for visualization agent
+            context = ""
+            if request.data:
+                context += f"Data to visualize: {request.data}\n"
+            if request.chart_type:
+                context += f"Preferred chart type: {request.chart_type}\n"
+            context += f"Request: {request.query}"
+            artifact = await _run_visualization_agent(context)
+        latency = time.perf_counter() - started
+        visualization_latency.record(visualization_path, latency)
         
         # Prepare response
         response_data = {
             'success': True,
             'timestamp': datetime.now().isoformat(),
             'query': request.query,
-            'operation': 'visualization'
+            'operation': 'visualization',
+            'path': visualization_path,
+            'latency_ms': round(latency * 1000, 3)
         }
         
-        if plot_path:
+        if artifact:
+            plot_path = artifact.plot_path
             response_data['plot_path'] = plot_path
             response_data['message'] = 'Visualization created successfully'
             # Make plot path accessible via the API
             response_data['plot_url'] = f"/api/v1/files/{os.path.basename(plot_path)}"
+            if artifact.thumbnail_path:
+                response_data['thumbnail_url'] = f"/api/v1/files/{os.path.basename(artifact.thumbnail_path)}"
+            if artifact.format == 'plotly':
+                # The browser draws the chart from the spec, so it is returned inline
+                response_data['plot_spec'] = await asyncio.to_thread(lambda: json.loads(Path(plot_path).read_text()))
+            response_data['render'] = artifact.render_stats()
+            response_data['tool'] = artifact.tool
             logger.info(f"Visualization created successfully: {plot_path}")
         else:
             response_data['success'] = False
@@ -437,6 +723,8 @@ async def create_visualization(request: VisualizationRequest, _: None = Depends(
         
         return JSONResponse(content=response_data)
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Visualization endpoint error: {str(e)}")
         logger.error(traceback.format_exc())
@@ -450,10 +738,41 @@ async def create_visualization(request: VisualizationRequest, _: None = Depends(
             }
         )
 
+@asynccontextmanager
+async def analysis_executor(file_path: str, session_id: Optional[str], run_dir: Path):
+    """Lease a code executor with the input file staged; its outputs are collected into run_dir on release.
+    With kernels enabled, a session's code runs on its kernel; requests without a session use the warm worker"""
+    async with executor_pool.lease(destination=run_dir) as worker:
+        await asyncio.to_thread(worker.stage, file_path)
+        if kernel_sessions is None or not session_id:
+            yield worker
+            return
+        async with kernel_sessions.acquire(session_id, worker.directory) as kernel:
+            current_code_executor.set(kernel)
+            yield worker
+
+def analysis_task(task: str, session_id: Optional[str]) -> str:
+    """Tell the agent when its code runs on a session kernel that keeps variables between blocks"""
+    if kernel_sessions is None or not session_id:
+        return task
+    return task + SESSION_KERNEL_NOTE
+
+def run_artifacts(run_id: str) -> dict:
+    """Stream message listing the files one analysis run produced"""
+    return {
+        'type': 'artifacts',
+        'run_id': run_id,
+        'files': [
+            {'name': name, 'url': f"/api/v1/runs/{run_id}/files/{quote(name)}"}
+            for name in run_workspaces.files(run_id)
+        ]
+    }
+
 @app.post("/api/v1/data-analysis/upload")
 async def upload_and_analyze_stream(
     file: UploadFile = File(...),
     task: str = Form("Analyze the uploaded data"),
+    session_id: Optional[str] = Form(None),
     _: None = Depends(ensure_initialized)
 ):
     """
@@ -468,34 +787,52 @@ async def upload_and_analyze_stream(
         if len(contents) > MAX_UPLOAD_SIZE:
             raise HTTPException(status_code=413, detail="File too large")
         
+        if session_id:
+            try:
+                SessionRegistry.validate_session_id(session_id)
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+        
         # Save uploaded file
         filename = file.filename
         file_path = os.path.join(UPLOAD_FOLDER, filename)
         
-        with open(file_path, "wb") as f:
-            f.write(contents)
+        # Written aside and renamed into place, so a run copying the old file never reads a half-written one
+        fd, temp_path = tempfile.mkstemp(dir=UPLOAD_FOLDER, prefix=".upload-", suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(contents)
+            os.replace(temp_path, file_path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
         
-        logger.info(f"File uploaded: {filename}, Task: {task}")
+        run_id, run_dir = run_workspaces.create()
+        logger.info(f"File uploaded: {filename}, Task: {task}, Run: {run_id}")
         
         async def generate_analysis_response():
             try:
                 # Import the streaming function
                 from util.stream_data_anaylisi import run_code_executor_agent_streamlit
                 
-                # Create docker executor
-                docker = create_docker_cmd_code_excuter()
-                
-                # Process the analysis task
-                async_gen = run_code_executor_agent_streamlit(
-                    team=data_analysis_team,
-                    docker=docker,
-                    file_name=filename,
-                    task=task
-                )
+                # Process the analysis task on a leased executor and team
+                async with analysis_executor(file_path, session_id, run_dir) as worker, data_analysis_pool.lease() as data_analysis_team:
+                    async_gen = run_code_executor_agent_streamlit(
+                        team=data_analysis_team,
+                        docker=None,
+                        file_name=filename,
+                        task=analysis_task(task, session_id)
+                    )
+                    
+                    # Stream all messages
+                    async for message_data in async_gen:
+                        # The runner reports errors as messages instead of raising them
+                        if message_data.get('type') == 'error':
+                            worker.mark_failed()
+                        yield message_data
                 
-                # Stream all messages
-                async for message_data in async_gen:
-                    yield message_data
+                # Outputs are only in the run directory once the executor is released
+                yield run_artifacts(run_id)
                     
             except Exception as e:
                 logger.error(f"Data analysis processing failed: {str(e)}")
@@ -508,7 +845,7 @@ async def upload_and_analyze_stream(
         return StreamingResponse(
             stream_json_response(
                 generate_analysis_response(),
-                {'filename': filename, 'task': task, 'operation': 'data_analysis_upload'}
+                {'filename': filename, 'task': task, 'run_id': run_id, 'operation': 'data_analysis_upload'}
             ),
             media_type="text/plain",
             headers={"Cache-Control": "no-cache", "Connection": "keep-alive"}
@@ -530,24 +867,35 @@ async def analyze_existing_file_stream(request: DataAnalysisRequest, _: None = D
         file_path = os.path.join(UPLOAD_FOLDER, request.filename)
         if not os.path.exists(file_path):
             raise HTTPException(status_code=404, detail=f"File {request.filename} not found")
+        if request.session_id:
+            try:
+                SessionRegistry.validate_session_id(request.session_id)
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
         
-        logger.info(f"Analyzing existing file: {request.filename}, Task: {request.task}")
+        run_id, run_dir = run_workspaces.create()
+        logger.info(f"Analyzing existing file: {request.filename}, Task: {request.task}, Run: {run_id}")
         
         async def generate_file_analysis_response():
             try:
                 from util.stream_data_anaylisi import run_code_executor_agent_streamlit
                 
-                docker = create_docker_cmd_code_excuter()
-                
-                async_gen = run_code_executor_agent_streamlit(
-                    team=data_analysis_team,
-                    docker=docker,
-                    file_name=request.filename,
-                    task=request.task
-                )
+                async with analysis_executor(file_path, request.session_id, run_dir) as worker, data_analysis_pool.lease() as data_analysis_team:
+                    async_gen = run_code_executor_agent_streamlit(
+                        team=data_analysis_team,
+                        docker=None,
+                        file_name=request.filename,
+                        task=analysis_task(request.task, request.session_id)
+                    )
+                    
+                    async for message_data in async_gen:
+                        # The runner reports errors as messages instead of raising them
+                        if message_data.get('type') == 'error':
+                            worker.mark_failed()
+                        yield message_data
                 
-                async for message_data in async_gen:
-                    yield message_data
+                # Outputs are only in the run directory once the executor is released
+                yield run_artifacts(run_id)
                     
             except Exception as e:
                 logger.error(f"File analysis processing failed: {str(e)}")
@@ -560,7 +908,7 @@ async def analyze_existing_file_stream(request: DataAnalysisRequest, _: None = D
         return StreamingResponse(
             stream_json_response(
                 generate_file_analysis_response(),
-                {'filename': request.filename, 'task': request.task, 'operation': 'data_analysis_query'}
+                {'filename': request.filename, 'task': request.task, 'run_id': run_id, 'operation': 'data_analysis_query'}
             ),
             media_type="text/plain",
             headers={"Cache-Control": "no-cache", "Connection": "keep-alive"}
@@ -585,13 +933,14 @@ async def download_file(filename: str):
                 media_type='application/octet-stream'
             )
         
-        # Check in plots folder
+        # Check in plots folder; charts are served with their real type so browsers can show them inline
         file_path = os.path.join(PLOTS_FOLDER, filename)
         if os.path.exists(file_path):
             return FileResponse(
                 path=file_path,
                 filename=filename,
-                media_type='application/octet-stream'
+                media_type=mimetypes.guess_type(filename)[0] or 'application/octet-stream',
+                content_disposition_type='inline'
             )
         
         raise HTTPException(status_code=404, detail="File not found")
@@ -602,6 +951,26 @@ async def download_file(filename: str):
         logger.error(f"File download error: {str(e)}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
+@app.get("/api/v1/runs/{run_id}")
+async def list_run_files(run_id: str):
+    """List the files a data-analysis run produced"""
+    if run_workspaces.path(run_id) is None:
+        raise HTTPException(status_code=404, detail="Run not found or expired")
+    return run_artifacts(run_id)
+
+@app.get("/api/v1/runs/{run_id}/files/{filename:path}")
+async def download_run_file(run_id: str, filename: str):
+    """Download a file a data-analysis run produced; filename may include subdirectories"""
+    file_path = run_workspaces.path(run_id, filename)
+    if file_path is None:
+        raise HTTPException(status_code=404, detail="File not found")
+    return FileResponse(
+        path=file_path,
+        filename=file_path.name,
+        media_type=mimetypes.guess_type(filename)[0] or 'application/octet-stream',
+        content_disposition_type='inline'
+    )
+
 @app.get("/api/v1/files", response_model=FileListResponse)
 async def list_files():
     """List all available files"""
@@ -611,7 +980,7 @@ async def list_files():
         # List uploaded files
         upload_dir = Path(UPLOAD_FOLDER)
         if upload_dir.exists():
-            files.uploaded = [f.name for f in upload_dir.iterdir() if f.is_file()]
+            files.uploaded = [f.name for f in upload_dir.iterdir() if f.is_file() and not f.name.startswith('.')]
         
         # List plot files
         plots_dir = Path(PLOTS_FOLDER)
@@ -629,15 +998,17 @@ async def reset_teams(request: TeamResetRequest, _: None = Depends(ensure_initia
     """Reset all teams to clear context"""
     try:
         try:
+            # Leased teams are reset on checkin, so only idle ones need clearing here
             if request.team == 'all':
-                await team_manager.reset_teams()
-                await team_manager.reset_data_analysis_team()
+                await database_pool.reset_idle()
+                await visualization_pool.reset_idle()
+                await data_analysis_pool.reset_idle()
             elif request.team == 'database':
-                await team_manager.reset_db_team()
+                await database_pool.reset_idle()
             elif request.team == 'visualization':
-                await team_manager.reset_visualization_team()
+                await visualization_pool.reset_idle()
             elif request.team == 'data_analysis':
-                await team_manager.reset_data_analysis_team()
+                await data_analysis_pool.reset_idle()
             else:
                 raise HTTPException(status_code=400, detail=f"Unknown team: {request.team}")
             
@@ -729,7 +1100,12 @@ async def api_info():
             "data_analysis_upload": "/api/v1/data-analysis/upload",
             "data_analysis_query": "/api/v1/data-analysis/query",
             "files_list": "/api/v1/files",
-            "teams_reset": "/api/v1/teams/reset"
+            "teams_reset": "/api/v1/teams/reset",
+            "metrics": "/api/v1/metrics",
+            "session_delete": "/api/v1/sessions/{session_id}",
+            "database_schema": "/api/v1/database/schema",
+            "database_result": "/api/v1/database/results/{result_id}",
+            "database_result_stream": "/api/v1/database/results/{result_id}/stream"
         }
     }
 
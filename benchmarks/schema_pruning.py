@@ -0,0 +1,98 @@
+"""
+Turns and prompt tokens for the database agent with and without schema pruning.
+
+    python -m benchmarks.schema_pruning          # offline estimate from the catalog
+    python -m benchmarks.schema_pruning --live   # runs the agent (needs OPENAI_API_KEY)
+
+The offline mode replays the discovery the agent does without a schema in its first turn
+(list tables -> fetch schema -> query -> answer) against the pruned flow (query -> answer),
+counting the tokens each LLM call is sent. Query results are left out of both sides since
+they are the same either way.
+"""
+import argparse
+import asyncio
+
+import tiktoken
+
+from agent.database_agent import DATABASE_SYSTEM_MESSAGE, create_database_agent
+from config import get_openai_client
+from database import DatabaseManager
+
+QUESTIONS = [
+    "How many orders are still Processing?",
+    "Top 5 products by rating",
+    "Which customers bought a product from the Electronics category?",
+    "Total revenue by supplier",
+    "Average order value per city",
+]
+
+# Rough cost of a tool call request/response wrapper in the chat history
+TOOL_CALL_TOKENS = 40
+SQL_TOKENS = 60
+
+
+def offline(manager: DatabaseManager):
+    encoding = tiktoken.get_encoding("o200k_base")
+    count = lambda text: len(encoding.encode(text))
+    catalog = manager.catalog
+    system = count(DATABASE_SYSTEM_MESSAGE)
+    listing = count(", ".join(catalog.table_names()))
+
+    print(f"{'question':<66} {'turns':>11} {'prompt tokens':>17} {'schema tokens':>15}")
+    totals = [0, 0, 0, 0]
+    for question in QUESTIONS:
+        # Without pruning the model looks up every table it might need before writing SQL
+        schema = count(catalog.table_info(catalog.table_names()))
+        history = [system + count(question)]
+        history.append(history[-1] + TOOL_CALL_TOKENS + listing)
+        history.append(history[-1] + TOOL_CALL_TOKENS + schema)
+        history.append(history[-1] + SQL_TOKENS)
+        before_turns, before_tokens = len(history), sum(history)
+
+        task = manager.build_task(question)
+        history = [system + count(task)]
+        history.append(history[-1] + SQL_TOKENS)
+        after_turns, after_tokens = len(history), sum(history)
+        summary = count(task) - count(question)
+
+        totals = [totals[0] + before_turns, totals[1] + after_turns, totals[2] + before_tokens, totals[3] + after_tokens]
+        print(f"{question:<66} {before_turns:>5} -> {after_turns:<3} {before_tokens:>7} -> {after_tokens:<6} {schema:>6} -> {summary:<6}")
+    print(f"{'total':<66} {totals[0]:>5} -> {totals[1]:<3} {totals[2]:>7} -> {totals[3]:<6}")
+
+
+async def _run(team, task):
+    result = await team.run(task=task)
+    await team.reset()
+    usage = [message.models_usage for message in result.messages if message.models_usage]
+    return len(usage), sum(u.prompt_tokens for u in usage), sum(u.completion_tokens for u in usage)
+
+
+async def live(manager: DatabaseManager):
+    from teams import TeamManager
+
+    team = TeamManager().create_db_team(create_database_agent(get_openai_client(), manager.get_tools()))
+    print(f"{'question':<66} {'LLM calls':>11} {'prompt tokens':>17} {'completion':>13}")
+    for question in QUESTIONS:
+        before = await _run(team, question)
+        after = await _run(team, manager.build_task(question))
+        print(f"{question:<66} {before[0]:>5} -> {after[0]:<3} {before[1]:>7} -> {after[1]:<6} {before[2]:>5} -> {after[2]:<5}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--live", action="store_true", help="run the agent against the model instead of estimating")
+    parser.add_argument("--db", default="sqlite:///database/ecommerce.db")
+    args = parser.parse_args()
+
+    manager = DatabaseManager(args.db)
+    manager.connect()
+    if manager.pruner is None:
+        raise SystemExit("Schema pruning is disabled (SCHEMA_PRUNING=false) or the database is not SQLite")
+    if args.live:
+        asyncio.run(live(manager))
+    else:
+        offline(manager)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,12 @@
-from .settings import get_openai_client, get_llm, load_environment
+from .settings import (
+    get_openai_client, get_llm, load_environment, get_team_pool_size, get_session_settings,
+    get_embedding_function, get_query_cache_settings, get_sql_cache_settings,
+    get_sql_result_settings, get_database_settings, get_sql_guard_settings, get_render_pool_settings,
+    get_render_cache_settings, get_plot_settings, get_code_executor_settings
+)
 
-__all__ = ['get_openai_client', 'get_llm', 'load_environment']
+__all__ = ['get_openai_client', 'get_llm', 'load_environment', 'get_team_pool_size', 'get_session_settings',
+           'get_embedding_function', 'get_query_cache_settings', 'get_sql_cache_settings',
+           'get_sql_result_settings', 'get_database_settings', 'get_sql_guard_settings',
+           'get_render_pool_settings', 'get_render_cache_settings',
+           'get_plot_settings', 'get_code_executor_settings']
@@ -1,6 +1,6 @@
 import os
 from dotenv import load_dotenv
-from langchain_openai import ChatOpenAI
+from langchain_openai import ChatOpenAI, OpenAIEmbeddings
 from autogen_ext.models.openai import OpenAIChatCompletionClient
 
 def load_environment():
@@ -24,3 +24,125 @@ def get_openai_client(model: str = "gpt-4o-mini", api_key: str = None):
 
     """Get OpenAI chat completion client"""
     return OpenAIChatCompletionClient(model=model, api_key=api_key)
+
+def get_team_pool_size(default: int = 4) -> int:
+    """Number of pre-built teams kept per team type"""
+    load_environment()
+    return int(os.getenv("TEAM_POOL_SIZE") or default)
+
+def get_session_settings() -> dict:
+    """Limits for the per-session team registry"""
+    load_environment()
+    return {
+        "max_sessions": int(os.getenv("SESSION_MAX") or 100),
+        "idle_ttl": float(os.getenv("SESSION_IDLE_TTL") or 1800),
+        "memory_budget_bytes": int(float(os.getenv("SESSION_MEMORY_BUDGET_MB") or 64) * 1024 * 1024),
+        "spill_dir": os.getenv("SESSION_SPILL_DIR") or "sessions",
+    }
+
+def get_embedding_function(api_key: str = None):
+    """Text -> vector function used for semantic query caching"""
+    if not api_key:
+        api_key = load_environment()
+    return OpenAIEmbeddings(model="text-embedding-3-small", api_key=api_key).embed_query
+
+def get_query_cache_settings() -> dict:
+    """Limits for the natural-language query result cache"""
+    load_environment()
+    return {
+        "max_entries": int(os.getenv("QUERY_CACHE_MAX_ENTRIES") or 512),
+        "ttl": float(os.getenv("QUERY_CACHE_TTL") or 3600),
+        "semantic": (os.getenv("QUERY_CACHE_SEMANTIC") or "false").lower() == "true",
+        "similarity_threshold": float(os.getenv("QUERY_CACHE_SIMILARITY") or 0.95),
+    }
+
+def get_sql_cache_settings() -> dict:
+    """Limits for the in-memory SQL result cache used by the query tool"""
+    load_environment()
+    return {
+        "max_bytes": int(float(os.getenv("SQL_CACHE_MAX_MB") or 32) * 1024 * 1024),
+        "max_entry_bytes": int(float(os.getenv("SQL_CACHE_MAX_ENTRY_MB") or 4) * 1024 * 1024),
+        "ttl": float(os.getenv("SQL_CACHE_TTL") or 300),
+    }
+
+def get_sql_result_settings() -> dict:
+    """Row limits for structured SQL results kept server-side and shown to the model"""
+    load_environment()
+    return {
+        "max_rows": int(os.getenv("SQL_RESULT_MAX_ROWS") or 10000),
+        "llm_rows": int(os.getenv("SQL_RESULT_LLM_ROWS") or 50),
+        "execution_mode": os.getenv("SQL_EXECUTION_MODE") or "cursor",
+        "batch_size": int(os.getenv("SQL_FETCH_BATCH_SIZE") or 1000),
+        "query_timeout": float(os.getenv("SQL_QUERY_TIMEOUT") or 15),
+    }
+
+def get_sql_guard_settings() -> dict:
+    """Thresholds for the EXPLAIN QUERY PLAN cost guard on agent SQL"""
+    load_environment()
+    return {
+        "enabled": (os.getenv("SQL_GUARD_ENABLED") or "true").lower() == "true",
+        "large_table_rows": int(os.getenv("SQL_GUARD_LARGE_TABLE_ROWS") or 100000),
+        "max_cost": float(os.getenv("SQL_GUARD_MAX_COST") or 50_000_000),
+    }
+
+def get_render_pool_settings() -> dict:
+    """Worker processes for chart rendering; 0 renders in a thread instead"""
+    load_environment()
+    return {
+        "workers": int(os.getenv("RENDER_POOL_WORKERS") or min(4, os.cpu_count() or 1)),
+    }
+
+def get_plot_settings() -> dict:
+    """Point budget and scatter reduction for large series, and the default render profile"""
+    load_environment()
+    return {
+        "max_points": int(os.getenv("PLOT_MAX_POINTS") or 5000),
+        "scatter_reduction": os.getenv("PLOT_SCATTER_REDUCTION") or "density",
+        "profile": os.getenv("RENDER_PROFILE") or "report",
+        "thumbnail": (os.getenv("RENDER_THUMBNAIL") or "false").lower() == "true",
+    }
+
+def get_render_cache_settings() -> dict:
+    """Directory and size budget for content-addressed chart files"""
+    load_environment()
+    return {
+        "directory": os.getenv("RENDER_CACHE_DIR") or "plots",
+        "max_mb": float(os.getenv("RENDER_CACHE_MAX_MB") or 512),
+    }
+
+def get_database_settings() -> dict:
+    """Engine, pool and SQLite pragma settings for the shared database engine"""
+    load_environment()
+    return {
+        "pool_size": int(os.getenv("DB_POOL_SIZE") or 5),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW") or 10),
+        "pre_ping": (os.getenv("DB_POOL_PRE_PING") or "true").lower() == "true",
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE") or 3600),
+        "read_only": (os.getenv("DB_READ_ONLY") or "true").lower() == "true",
+        # Opt-in: switching to WAL rewrites the database file's header and leaves -wal/-shm files beside it
+        "wal": (os.getenv("DB_WAL") or "false").lower() == "true",
+        "mmap_size_mb": float(os.getenv("DB_MMAP_SIZE_MB") or 256),
+        "cache_size_mb": float(os.getenv("DB_CACHE_SIZE_MB") or 64),
+        "busy_timeout": float(os.getenv("DB_BUSY_TIMEOUT") or 5),
+        "statement_timeout": float(os.getenv("DB_STATEMENT_TIMEOUT") or 30),
+        "catalog_dir": os.getenv("SCHEMA_CATALOG_DIR") or "database/catalog_cache",
+        "schema_pruning": (os.getenv("SCHEMA_PRUNING") or "true").lower() == "true",
+        "schema_pruning_max_tables": int(os.getenv("SCHEMA_PRUNING_MAX_TABLES") or 4),
+    }
+
+def get_code_executor_settings() -> dict:
+    """Working directory, virtualenv, worker pool and run workspaces for the data-analysis code executor"""
+    load_environment()
+    return {
+        "work_dir": os.getenv("CODE_EXECUTOR_WORK_DIR") or "coding",
+        "venv_dir": os.getenv("CODE_EXECUTOR_VENV_DIR") or "coding/.venv",
+        "requirements": os.getenv("CODE_EXECUTOR_REQUIREMENTS") or "requirements-analysis.txt",
+        "wheelhouse": os.getenv("CODE_EXECUTOR_WHEELHOUSE") or "wheelhouse",
+        "pool_size": int(os.getenv("CODE_EXECUTOR_POOL_SIZE") or min(4, os.cpu_count() or 1)),
+        "max_runs": int(os.getenv("CODE_EXECUTOR_MAX_RUNS") or 20),
+        "kernel": (os.getenv("CODE_EXECUTOR_KERNEL") or "true").lower() == "true",
+        "kernel_memory_mb": int(os.getenv("CODE_EXECUTOR_KERNEL_MEMORY_MB") or 4096),
+        "kernel_idle_ttl": float(os.getenv("CODE_EXECUTOR_KERNEL_IDLE_TTL") or 600),
+        "max_kernels": int(os.getenv("CODE_EXECUTOR_MAX_KERNELS") or 8),
+        "run_ttl": float(os.getenv("CODE_EXECUTOR_RUN_TTL") or 3600),
+    }
@@ -1,3 +1,7 @@
 from .db_manager import DatabaseManager
+from .engine import get_shared_engine, engine_metrics
+from .schema_catalog import SchemaCatalog, get_shared_catalog
+from .schema_pruner import SchemaPruner, build_database_task
 
-__all__ = ['DatabaseManager']
+__all__ = ['DatabaseManager', 'get_shared_engine', 'engine_metrics', 'SchemaCatalog', 'get_shared_catalog',
+           'SchemaPruner', 'build_database_task']
@@ -1,22 +1,46 @@
 from tool.sql_tool_kit import get_sql_tools
+from config import get_database_settings
+from database.engine import get_shared_engine, engine_metrics
+from database.schema_catalog import get_shared_catalog
+from database.schema_pruner import SchemaPruner, build_database_task
 
 from autogen_ext.tools.langchain import LangChainToolAdapter
 
 class DatabaseManager:
     """Manages database connections and toolkit creation"""
     
-    def __init__(self, db_uri: str = "sqlite:///database/ecommerce.db"):
+    def __init__(self, db_uri: str = "sqlite:///database/ecommerce.db", settings: dict = None):
         self.db_uri = db_uri
+        self.settings = settings or get_database_settings()
        
+        self.engine = None
+        self.catalog = None
+        self.pruner = None
         self.toolkit = None
         
     def connect(self):
         """Connect to database and create toolkit"""
         
-        self.toolkit = get_sql_tools( self.db_uri)
+        # Engines are shared per URI, so every manager, team and session uses one pool
+        self.engine = get_shared_engine(self.db_uri, self.settings)
+        if self.engine.dialect.name == "sqlite":
+            self.catalog = get_shared_catalog(self.engine, cache_dir=self.settings["catalog_dir"])
+            if self.settings["schema_pruning"]:
+                self.pruner = SchemaPruner(self.catalog, max_tables=self.settings["schema_pruning_max_tables"])
+        self.toolkit = get_sql_tools(self.db_uri, engine=self.engine, catalog=self.catalog)
     
     def get_tools(self):
         """Get LangChain adapted tools from toolkit"""
         if not self.toolkit:
             raise ValueError("Database not connected. Call connect() first.")
         return [LangChainToolAdapter(tool) for tool in self.toolkit]
+    
+    def build_task(self, question: str) -> str:
+        """User question plus the relevant part of the schema, so the agent can skip schema discovery"""
+        return build_database_task(question, self.pruner)
+    
+    def metrics(self):
+        """Connection pool metrics for the shared engine"""
+        if not self.engine:
+            return {"connected": False}
+        return {"connected": True, **engine_metrics(self.engine)}
@@ -0,0 +1,161 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool
+
+logger = logging.getLogger(__name__)
+
+_engines = {}
+_engines_lock = threading.Lock()
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long callers wait to check out a connection"""
+
+    _stats_lock = threading.Lock()
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            waited = time.perf_counter() - started
+            with self._stats_lock:
+                stats = self.__dict__.setdefault("checkout_stats", {"count": 0, "total": 0.0, "max": 0.0})
+                stats["count"] += 1
+                stats["total"] += waited
+                stats["max"] = max(stats["max"], waited)
+
+
+def _enable_wal(db_path: str):
+    """WAL is a property of the database file, so it must be set once from a writable connection.
+    This is a one-time migration of the file, which is why DB_WAL defaults to off"""
+    try:
+        conn = sqlite3.connect(db_path)
+        try:
+            mode = conn.execute("PRAGMA journal_mode=WAL").fetchone()[0]
+        finally:
+            conn.close()
+        if mode.lower() != "wal":
+            logger.warning(f"Could not switch {db_path} to WAL, journal mode is {mode}")
+    except sqlite3.Error as e:
+        logger.warning(f"Could not enable WAL on {db_path}: {e}")
+
+
+def _sqlite_url(db_uri: str, read_only: bool):
+    """Rewrite sqlite:///path into a sqlite3 URI filename so mode=ro can be applied"""
+    url = make_url(db_uri)
+    database = url.database or ""
+    if database.startswith("file:") or database in ("", ":memory:"):
+        return url, database.split("?", 1)[0].removeprefix("file:")
+    query = {"uri": "true"}
+    if read_only:
+        query["mode"] = "ro"
+    return url.set(database=f"file:{database}", query=query), database
+
+
+def _install_sqlite_pragmas(engine, settings):
+    mmap_bytes = int(settings["mmap_size_mb"] * 1024 * 1024)
+    cache_kib = int(settings["cache_size_mb"] * 1024)
+    statement_timeout = settings["statement_timeout"]
+
+    @event.listens_for(engine, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f"PRAGMA mmap_size={mmap_bytes}")
+        # Negative cache_size is in KiB rather than pages
+        cursor.execute(f"PRAGMA cache_size=-{cache_kib}")
+        cursor.execute(f"PRAGMA busy_timeout={int(settings['busy_timeout'] * 1000)}")
+        if settings["read_only"]:
+            cursor.execute("PRAGMA query_only=1")
+        cursor.close()
+
+        # SQLite has no statement timeout, so abort from the progress handler once past
+        # the deadline or once the caller's cancel event fires
+        info = connection_record.info
+        info["deadline"] = None
+        info["cancel_event"] = None
+
+        def check_deadline():
+            cancel_event = info.get("cancel_event")
+            if cancel_event is not None and cancel_event.is_set():
+                return 1
+            deadline = info.get("deadline")
+            return 1 if deadline is not None and time.monotonic() > deadline else 0
+
+        dbapi_connection.set_progress_handler(check_deadline, 1000)
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def start_statement_clock(conn, cursor, statement, parameters, context, executemany):
+        options = conn.get_execution_options()
+        timeout = options.get("statement_timeout", statement_timeout)
+        info = conn.connection.info
+        info["deadline"] = time.monotonic() + timeout if timeout else None
+        info["cancel_event"] = options.get("cancel_event")
+
+    # The deadline also covers fetches, since SQLite does most of its work while stepping rows
+    @event.listens_for(engine, "checkin")
+    def stop_statement_clock(dbapi_connection, connection_record):
+        connection_record.info["deadline"] = None
+        connection_record.info["cancel_event"] = None
+
+
+def build_engine(db_uri: str, settings: dict):
+    """Create a pooled engine; SQLite files get read-only URIs, tuning pragmas and, with DB_WAL, WAL"""
+    url = make_url(db_uri)
+    if url.get_backend_name() != "sqlite":
+        return create_engine(
+            db_uri,
+            pool_size=settings["pool_size"],
+            max_overflow=settings["max_overflow"],
+            pool_pre_ping=settings["pre_ping"],
+            pool_recycle=settings["pool_recycle"],
+        )
+
+    sqlite_url, db_path = _sqlite_url(db_uri, settings["read_only"])
+    if settings["wal"] and db_path and os.path.exists(db_path):
+        _enable_wal(db_path)
+
+    engine = create_engine(
+        sqlite_url,
+        poolclass=TimedQueuePool,
+        pool_size=settings["pool_size"],
+        max_overflow=settings["max_overflow"],
+        pool_pre_ping=settings["pre_ping"],
+        pool_recycle=settings["pool_recycle"],
+        connect_args={"check_same_thread": False},
+    )
+    _install_sqlite_pragmas(engine, settings)
+    logger.info(f"Database engine ready for {db_path} (read_only={settings['read_only']}, pool_size={settings['pool_size']})")
+    return engine
+
+
+def get_shared_engine(db_uri: str, settings: dict):
+    """One engine per database URI for the whole process"""
+    with _engines_lock:
+        engine = _engines.get(db_uri)
+        if engine is None:
+            engine = build_engine(db_uri, settings)
+            _engines[db_uri] = engine
+        return engine
+
+
+def engine_metrics(engine) -> dict:
+    """Pool occupancy and checkout latency for an engine"""
+    pool = engine.pool
+    metrics = {"pool_status": pool.status()}
+    stats = getattr(pool, "checkout_stats", None)
+    if stats:
+        metrics.update({
+            "checkouts": stats["count"],
+            "avg_checkout_ms": round(stats["total"] / stats["count"] * 1000, 3),
+            "max_checkout_ms": round(stats["max"] * 1000, 3),
+        })
+    if hasattr(pool, "checkedout"):
+        metrics.update({"checked_out": pool.checkedout(), "idle": pool.checkedin(), "overflow": pool.overflow()})
+    return metrics
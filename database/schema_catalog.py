@@ -0,0 +1,234 @@
+import hashlib
+import json
+import logging
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from sqlalchemy import text
+
+from tool.sql_cache import database_version
+
+logger = logging.getLogger(__name__)
+
+
+def _quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _jsonable(value):
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return f"<{len(value)} bytes>"
+    if value is not None and not isinstance(value, (str, int, float, bool)):
+        return str(value)
+    return value
+
+
+class SchemaCatalog:
+    """Schema, row counts, samples and column statistics built once and served from memory"""
+
+    def __init__(self, engine, cache_dir="database/catalog_cache", sample_rows: int = 3, top_values: int = 5,
+                 refresh_interval: float = 30):
+        self.engine = engine
+        self.cache_dir = Path(cache_dir)
+        self.sample_rows = sample_rows
+        self.top_values = top_values
+        self.refresh_interval = refresh_interval
+        self.tables: Dict[str, dict] = {}
+        self.schema_hash: Optional[str] = None
+        self._version = None
+        self._lock = threading.Lock()
+        # Held while a background refresh runs, so at most one is in flight
+        self._refreshing = threading.Lock()
+        self._last_refresh = 0.0
+
+    def _cache_path(self, schema_hash: str) -> Path:
+        return self.cache_dir / f"catalog_{schema_hash}.json"
+
+    def _read_ddl(self, connection) -> Dict[str, str]:
+        rows = connection.execute(text(
+            "SELECT name, sql FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' ORDER BY name"
+        ))
+        return {name: sql for name, sql in rows}
+
+    @staticmethod
+    def _hash(value: str) -> str:
+        return hashlib.sha256(value.encode("utf-8")).hexdigest()[:16]
+
+    def _describe_table(self, connection, name: str, ddl: str) -> dict:
+        """Introspect one table: columns, foreign keys, row count, samples and per-column stats"""
+        quoted = _quote(name)
+        columns = [
+            {"name": row[1], "type": row[2] or "", "not_null": bool(row[3]), "primary_key": bool(row[5])}
+            for row in connection.execute(text(f"PRAGMA table_info({quoted})"))
+        ]
+        foreign_keys = [
+            {"column": row[3], "references_table": row[2], "references_column": row[4]}
+            for row in connection.execute(text(f"PRAGMA foreign_key_list({quoted})"))
+        ]
+
+        # One pass over the table computes the row count and every column's summary
+        aggregates = ["COUNT(*)"]
+        for column in columns:
+            c = _quote(column["name"])
+            aggregates += [f"COUNT({c})", f"COUNT(DISTINCT {c})", f"MIN({c})", f"MAX({c})"]
+        summary = connection.execute(text(f"SELECT {', '.join(aggregates)} FROM {quoted}")).first()
+        row_count = summary[0]
+
+        for index, column in enumerate(columns):
+            non_null, distinct, minimum, maximum = summary[1 + index * 4: 5 + index * 4]
+            column["stats"] = {
+                "nulls": row_count - non_null,
+                "distinct": distinct,
+                "min": _jsonable(minimum),
+                "max": _jsonable(maximum),
+            }
+            # Low-cardinality columns are usually categories the model needs to filter on
+            if 0 < distinct <= self.top_values:
+                c = _quote(column["name"])
+                column["stats"]["values"] = [
+                    _jsonable(row[0]) for row in connection.execute(text(
+                        f"SELECT {c} FROM {quoted} WHERE {c} IS NOT NULL GROUP BY {c} ORDER BY COUNT(*) DESC"
+                    ))
+                ]
+
+        sample = [
+            [_jsonable(value) for value in row]
+            for row in connection.execute(text(f"SELECT * FROM {quoted} LIMIT {self.sample_rows}"))
+        ]
+        return {
+            "name": name,
+            "ddl": ddl,
+            "ddl_hash": self._hash(ddl),
+            "columns": columns,
+            "foreign_keys": foreign_keys,
+            "row_count": row_count,
+            "sample_rows": sample,
+        }
+
+    def load(self):
+        """Load the catalog from disk when the schema hash matches, otherwise build it"""
+        with self._lock:
+            with self.engine.connect() as connection:
+                # Catalog builds are one-off full passes, so they are exempt from the statement timeout
+                connection.execution_options(statement_timeout=None)
+                ddl = self._read_ddl(connection)
+                self.schema_hash = self._hash(json.dumps(ddl, sort_keys=True))
+                cache_path = self._cache_path(self.schema_hash)
+                if cache_path.exists():
+                    self.tables = json.loads(cache_path.read_text())["tables"]
+                    logger.info(f"Schema catalog loaded from {cache_path}")
+                    # Data may have changed since the file was written; recheck row counts
+                    self._refresh_locked(connection, ddl, check_rows=True)
+                else:
+                    self.tables = {name: self._describe_table(connection, name, sql) for name, sql in ddl.items()}
+                    self._save_locked()
+                    logger.info(f"Schema catalog built for {len(self.tables)} tables")
+            self._version = database_version(self.engine.url.database)
+        return self
+
+    def _refresh_locked(self, connection, ddl: Dict[str, str], check_rows: bool) -> List[str]:
+        """Re-describe only tables whose DDL or row count changed, and drop removed ones"""
+        # Built on a copy and swapped in whole, so readers never see a half-refreshed catalog
+        tables = dict(self.tables)
+        changed = []
+        for name in list(tables):
+            if name not in ddl:
+                del tables[name]
+                changed.append(name)
+        for name, sql in ddl.items():
+            entry = tables.get(name)
+            stale = entry is None or entry["ddl_hash"] != self._hash(sql)
+            if not stale and check_rows:
+                count = connection.execute(text(f"SELECT COUNT(*) FROM {_quote(name)}")).scalar()
+                stale = count != entry["row_count"]
+            if stale:
+                tables[name] = self._describe_table(connection, name, sql)
+                changed.append(name)
+        self.tables = tables
+        if changed:
+            self._save_locked()
+            logger.info(f"Schema catalog refreshed tables: {', '.join(changed)}")
+        return changed
+
+    def _save_locked(self):
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._cache_path(self.schema_hash).write_text(json.dumps({"schema_hash": self.schema_hash, "tables": self.tables}))
+
+    def ensure_fresh(self):
+        """Cheap per-call check. When the database file has changed, a background refresh is started
+        (at most one at a time, and no more often than refresh_interval) and the current catalog is served meanwhile"""
+        if database_version(self.engine.url.database) == self._version:
+            return
+        if time.monotonic() - self._last_refresh < self.refresh_interval:
+            return
+        if not self._refreshing.acquire(blocking=False):
+            return
+        self._last_refresh = time.monotonic()
+        threading.Thread(target=self._refresh, name="schema-catalog-refresh", daemon=True).start()
+
+    def _refresh(self):
+        try:
+            version = database_version(self.engine.url.database)
+            with self._lock:
+                with self.engine.connect() as connection:
+                    connection.execution_options(statement_timeout=None)
+                    ddl = self._read_ddl(connection)
+                    self.schema_hash = self._hash(json.dumps(ddl, sort_keys=True))
+                    self._refresh_locked(connection, ddl, check_rows=True)
+                # Writes made during the refresh leave the version different, so they are picked up next time
+                self._version = version
+        except Exception as e:
+            logger.error(f"Schema catalog refresh failed: {e}")
+        finally:
+            self._refreshing.release()
+
+    def table_names(self) -> List[str]:
+        self.ensure_fresh()
+        return sorted(self.tables)
+
+    def table_info(self, table_names: List[str]) -> str:
+        """Schema text in the same shape as SQLDatabase.get_table_info, plus row counts and stats"""
+        self.ensure_fresh()
+        lookup = {name.lower(): name for name in self.tables}
+        missing = [name for name in table_names if name.lower() not in lookup]
+        if missing:
+            return f"Error: table_names {set(missing)} not found in database"
+
+        blocks = []
+        for requested in table_names:
+            table = self.tables[lookup[requested.lower()]]
+            lines = [table["ddl"].strip(), "", "/*", f"Row count: {table['row_count']}", "Column stats:"]
+            for column in table["columns"]:
+                stats = column["stats"]
+                line = f"  {column['name']}: {stats['distinct']} distinct, {stats['nulls']} nulls"
+                if "values" in stats:
+                    line += f", values {stats['values']}"
+                elif stats["min"] is not None:
+                    line += f", range {stats['min']} .. {stats['max']}"
+                lines.append(line)
+            lines.append(f"{len(table['sample_rows'])} rows from {table['name']} table:")
+            lines.append("\t".join(column["name"] for column in table["columns"]))
+            lines += ["\t".join(str(value) for value in row) for row in table["sample_rows"]]
+            lines.append("*/")
+            blocks.append("\n".join(lines))
+        return "\n\n".join(blocks)
+
+    def to_dict(self) -> dict:
+        self.ensure_fresh()
+        return {"schema_hash": self.schema_hash, "tables": self.tables}
+
+
+_catalogs = {}
+_catalogs_lock = threading.Lock()
+
+
+def get_shared_catalog(engine, cache_dir="database/catalog_cache") -> SchemaCatalog:
+    """One loaded catalog per engine, shared by every manager that uses it"""
+    with _catalogs_lock:
+        catalog = _catalogs.get(id(engine))
+        if catalog is None:
+            catalog = SchemaCatalog(engine, cache_dir=cache_dir).load()
+            _catalogs[id(engine)] = catalog
+        return catalog
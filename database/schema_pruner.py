@@ -0,0 +1,167 @@
+import re
+from collections import defaultdict, deque
+from typing import Dict, List, Set
+
+_WORD = re.compile(r"[a-z0-9]+")
+_STOPWORDS = {
+    "a", "an", "the", "of", "in", "on", "for", "to", "and", "or", "by", "with", "from", "what", "which",
+    "who", "how", "many", "much", "is", "are", "was", "were", "show", "list", "give", "me", "all", "each",
+    "per", "top", "most", "least", "their", "that", "have", "has", "did", "do", "does", "i", "want", "get",
+}
+
+
+def _stem(word: str) -> str:
+    """Crude singular form so 'orders' matches 'order' and 'categories' matches 'category'"""
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+def _terms(text: str) -> Set[str]:
+    return {_stem(word) for word in _WORD.findall(text.lower()) if word not in _STOPWORDS}
+
+
+def _name_terms(name: str) -> Set[str]:
+    return {_stem(part) for part in name.lower().split("_") if part}
+
+
+class SchemaPruner:
+    """Picks the tables and columns a question needs from the schema catalog"""
+
+    def __init__(self, catalog, max_tables: int = 4):
+        self.catalog = catalog
+        self.max_tables = max_tables
+
+    @staticmethod
+    def _foreign_keys(tables: Dict[str, dict]) -> Dict[str, Dict[str, tuple]]:
+        """Declared foreign keys, plus <name>_id columns that match another table's primary key"""
+        primary_keys = {}
+        for name, table in tables.items():
+            for column in table["columns"]:
+                if column["primary_key"]:
+                    primary_keys[column["name"]] = name
+        foreign_keys = {}
+        for name, table in tables.items():
+            keys = {}
+            for column in table["columns"]:
+                target = primary_keys.get(column["name"])
+                if not column["primary_key"] and target and target != name:
+                    keys[column["name"]] = (target, column["name"])
+            for fk in table["foreign_keys"]:
+                if fk["references_table"] in tables:
+                    keys[fk["column"]] = (fk["references_table"], fk["references_column"])
+            foreign_keys[name] = keys
+        return foreign_keys
+
+    @staticmethod
+    def _graph(foreign_keys: Dict[str, Dict[str, tuple]]) -> Dict[str, Set[str]]:
+        graph = defaultdict(set)
+        for name, keys in foreign_keys.items():
+            for target, _ in keys.values():
+                graph[name].add(target)
+                graph[target].add(name)
+        return graph
+
+    def _score(self, question: str, tables: Dict[str, dict]):
+        """Keyword score per table, plus the columns that matched"""
+        terms = _terms(question)
+        scores = {}
+        matched_columns = defaultdict(set)
+        for name, table in tables.items():
+            score = 3.0 * len(_name_terms(name) & terms)
+            for column in table["columns"]:
+                column_terms = _name_terms(column["name"]) - {"id"}
+                hits = len(column_terms & terms)
+                values = column["stats"].get("values") or []
+                value_hits = sum(1 for value in values if isinstance(value, str) and _terms(value) & terms)
+                if hits or value_hits:
+                    score += hits + 2.0 * value_hits
+                    matched_columns[name].add(column["name"])
+            scores[name] = score
+        return scores, matched_columns
+
+    @staticmethod
+    def _path(graph, start: str, goal: str) -> List[str]:
+        """Shortest FK path between two tables (breadth-first)"""
+        previous = {start: None}
+        queue = deque([start])
+        while queue:
+            node = queue.popleft()
+            if node == goal:
+                path = []
+                while node is not None:
+                    path.append(node)
+                    node = previous[node]
+                return path[::-1]
+            for neighbour in sorted(graph[node]):
+                if neighbour not in previous:
+                    previous[neighbour] = node
+                    queue.append(neighbour)
+        return []
+
+    def select(self, question: str) -> Dict[str, Set[str]]:
+        """Map of selected table -> columns to show (an empty set means all columns)"""
+        self.catalog.ensure_fresh()
+        tables = self.catalog.tables
+        graph = self._graph(self._foreign_keys(tables))
+        scores, matched_columns = self._score(question, tables)
+
+        ranked = [name for name, score in sorted(scores.items(), key=lambda item: -item[1]) if score > 0]
+        if not ranked:
+            # Nothing matched; fall back to the best-connected tables
+            ranked = sorted(tables, key=lambda name: -len(graph[name]))
+        anchors = ranked[: self.max_tables]
+
+        # Bridge tables on the FK path between anchors are needed for the joins
+        selected = {name: set() for name in anchors if scores.get(name, 0) >= 3}
+        for name in anchors:
+            if name not in selected:
+                selected[name] = set(matched_columns[name])
+        for i, first in enumerate(anchors):
+            for second in anchors[i + 1:]:
+                for bridge in self._path(graph, first, second)[1:-1]:
+                    selected.setdefault(bridge, set())
+        return selected
+
+    def summary(self, question: str) -> str:
+        """Compact one-line-per-table schema for the selected tables"""
+        selected = self.select(question)
+        tables = self.catalog.tables
+        foreign_keys = self._foreign_keys(tables)
+        lines = []
+        for name, columns in selected.items():
+            table = tables[name]
+            fks = {column: f"{target}.{key}" for column, (target, key) in foreign_keys[name].items()}
+            parts = []
+            for column in table["columns"]:
+                is_key = column["primary_key"] or column["name"] in fks
+                if columns and not is_key and column["name"] not in columns:
+                    continue
+                part = f"{column['name']} {column['type']}".strip()
+                if column["primary_key"]:
+                    part += " PK"
+                if column["name"] in fks:
+                    part += f" -> {fks[column['name']]}"
+                # Listing values only helps for categories, not for unique columns like email
+                values = column["stats"].get("values")
+                if values and not is_key and column["stats"]["distinct"] < table["row_count"]:
+                    part += f" {values}"
+                parts.append(part)
+            lines.append(f"{name} (~{table['row_count']} rows): {', '.join(parts)}")
+        return "\n".join(lines)
+
+
+def build_database_task(question: str, pruner) -> str:
+    """First-turn task with the relevant schema inlined, so the agent can query straight away"""
+    if pruner is None:
+        return question
+    summary = pruner.summary(question)
+    if not summary:
+        return question
+    return (
+        f"{question}\n\n"
+        f"Relevant schema (SQLite; other tables exist, use sql_db_schema only if something is missing):\n"
+        f"{summary}"
+    )
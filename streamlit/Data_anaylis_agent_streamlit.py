@@ -3,6 +3,7 @@ from agent import create_human_agent, create_code_exuter_agent, create_data_anal
 from teams.team_manager import TeamManager
 from config import get_openai_client
 from tool import create_docker_cmd_code_excuter
+from tool.docker_executer import code_environment
 from util.stream_data_anaylisi import run_code_executor_agent_streamlit
 import asyncio
 import os 
@@ -11,7 +12,9 @@ import os
 team = TeamManager()
 docker = create_docker_cmd_code_excuter()
 code_excuter_agent = create_code_exuter_agent(docker=docker)
-data_analysis_expert = create_data_analysis_agent(openai_client=get_openai_client())
+data_analysis_expert = create_data_analysis_agent(
+    openai_client=get_openai_client(), installed_packages=code_environment.analysis_packages()
+)
 
 def take_human_input(prompt):
     """Function to take human input using Streamlit dialog"""
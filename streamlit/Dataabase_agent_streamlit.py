@@ -278,7 +278,7 @@ async def process_database_query_async(query, message_container, reset_team=True
     if reset_team:
         await st.session_state.database_team.reset()
     
-    db_result = st.session_state.database_team.run_stream(task=query)
+    db_result = st.session_state.database_team.run_stream(task=st.session_state.database.build_task(query))
     
     async for message in stream_db_conversation(db_result):
         if isinstance(message, dict):
@@ -1,3 +1,5 @@
 from .team_manager import TeamManager
+from .team_pool import TeamPool
+from .session_registry import SessionRegistry
 
-__all__ = ['TeamManager','create_simple_db_team', 'create_simple_visualization_team']
+__all__ = ['TeamManager', 'TeamPool', 'SessionRegistry', 'create_simple_db_team', 'create_simple_visualization_team']
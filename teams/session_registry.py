@@ -0,0 +1,183 @@
+import asyncio
+import json
+import logging
+import re
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+SESSION_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,128}$")
+
+
+class _Session:
+    """In-memory slot for one session's team"""
+
+    def __init__(self, team):
+        self.team = team
+        self.lock = asyncio.Lock()
+        self.active = 0
+        self.last_used = time.monotonic()
+        # Size of the serialized state when last measured; dirty once a request has run since
+        self.state_bytes = 0
+        self.dirty = False
+        self.restore_from = None
+
+
+class SessionRegistry:
+    """Per-session teams kept in LRU order, spilled to disk when idle or over budget"""
+
+    def __init__(
+        self,
+        name,
+        factory,
+        max_sessions: int = 100,
+        idle_ttl: float = 1800,
+        memory_budget_bytes: int = 64 * 1024 * 1024,
+        spill_dir="sessions",
+    ):
+        self.name = name
+        self.factory = factory
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self.memory_budget_bytes = memory_budget_bytes
+        self.spill_dir = Path(spill_dir) / name
+        self.spill_dir.mkdir(parents=True, exist_ok=True)
+        self._sessions = OrderedDict()
+        self._lock = asyncio.Lock()
+        self._stats = {"hits": 0, "restored": 0, "created": 0, "spilled": 0, "dropped": 0}
+
+    def _spill_path(self, session_id):
+        return self.spill_dir / f"{session_id}.json"
+
+    @staticmethod
+    def validate_session_id(session_id):
+        """Session ids double as file names, so keep them to a safe alphabet"""
+        if not SESSION_ID_PATTERN.match(session_id or ""):
+            raise ValueError("session_id must be 1-128 characters of letters, digits, '-' or '_'")
+
+    async def _load(self, session_id):
+        """Get the in-memory session, creating it if needed; spilled state is restored later, under the session's own lock"""
+        async with self._lock:
+            session = self._sessions.get(session_id)
+            if session is not None:
+                self._sessions.move_to_end(session_id)
+                session.active += 1
+                self._stats["hits"] += 1
+                return session
+
+            session = _Session(self.factory())
+            spill_path = self._spill_path(session_id)
+            if spill_path.exists():
+                session.restore_from = spill_path
+            else:
+                self._stats["created"] += 1
+            session.active += 1
+            self._sessions[session_id] = session
+            return session
+
+    async def _restore(self, session):
+        """Load spilled state into a fresh team; only this session waits on it"""
+        state = json.loads(await asyncio.to_thread(session.restore_from.read_text))
+        await session.team.load_state(state)
+        session.restore_from.unlink()
+        session.restore_from = None
+        session.dirty = True
+        self._stats["restored"] += 1
+
+    @asynccontextmanager
+    async def acquire(self, session_id):
+        """Lease the team for a session; requests on the same session run one at a time"""
+        self.validate_session_id(session_id)
+        session = await self._load(session_id)
+        try:
+            async with session.lock:
+                if session.restore_from is not None:
+                    await self._restore(session)
+                try:
+                    yield session.team
+                finally:
+                    session.last_used = time.monotonic()
+                    session.dirty = True
+        finally:
+            session.active -= 1
+        await self.enforce_limits()
+
+    async def _measure(self, session_id, session):
+        """Serialize a session's state to learn its size; too costly to do after every request"""
+        try:
+            state = await session.team.save_state()
+            session.state_bytes = len(json.dumps(state, default=str))
+            session.dirty = False
+        except Exception as e:
+            logger.warning(f"Session registry '{self.name}' could not size session {session_id}: {e}")
+
+    async def _spill(self, session_id, session):
+        """Write a session's team state to disk and drop it from memory"""
+        # A session whose restore failed still has its state on disk, untouched
+        if session.restore_from is None:
+            state = await session.team.save_state()
+            self._spill_path(session_id).write_text(json.dumps(state, default=str))
+        del self._sessions[session_id]
+        self._stats["spilled"] += 1
+
+    def _memory_used(self):
+        return sum(session.state_bytes for session in self._sessions.values())
+
+    async def enforce_limits(self, measure: bool = False):
+        """Spill idle sessions past their TTL, then least-recently-used ones until under budget.
+        Sizes are re-measured when asked (the reaper does) or once the last estimates near the budget"""
+        async with self._lock:
+            now = time.monotonic()
+            for session_id, session in list(self._sessions.items()):
+                if session.active:
+                    continue
+                if now - session.last_used > self.idle_ttl:
+                    await self._spill(session_id, session)
+
+            if measure or self._memory_used() >= self.memory_budget_bytes * 0.8:
+                for session_id, session in list(self._sessions.items()):
+                    if session.dirty and not session.active:
+                        await self._measure(session_id, session)
+
+            for session_id, session in list(self._sessions.items()):
+                if len(self._sessions) <= self.max_sessions and self._memory_used() <= self.memory_budget_bytes:
+                    break
+                if session.active:
+                    continue
+                await self._spill(session_id, session)
+
+    async def drop(self, session_id):
+        """Forget a session entirely, in memory and on disk"""
+        self.validate_session_id(session_id)
+        async with self._lock:
+            found = self._sessions.pop(session_id, None) is not None
+            spill_path = self._spill_path(session_id)
+            if spill_path.exists():
+                spill_path.unlink()
+                found = True
+        if found:
+            self._stats["dropped"] += 1
+        return found
+
+    async def run_reaper(self, interval: float = 60):
+        """Background loop that periodically re-measures sessions and enforces idle TTL and memory limits"""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.enforce_limits(measure=True)
+            except Exception as e:
+                logger.error(f"Session registry '{self.name}' reaper failed: {e}")
+
+    def metrics(self):
+        """Snapshot of session counts and memory use"""
+        return {
+            "in_memory": len(self._sessions),
+            "spilled_on_disk": sum(1 for _ in self.spill_dir.glob("*.json")),
+            "memory_bytes": self._memory_used(),
+            "unmeasured": sum(1 for session in self._sessions.values() if session.dirty),
+            "memory_budget_bytes": self.memory_budget_bytes,
+            **self._stats,
+        }
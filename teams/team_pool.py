@@ -0,0 +1,110 @@
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+
+logger = logging.getLogger(__name__)
+
+
+class TeamPool:
+    """Bounded pool of pre-built team instances leased out one request at a time"""
+
+    def __init__(self, name, factory, size: int = 4):
+        if size < 1:
+            raise ValueError("Team pool size must be at least 1")
+        self.name = name
+        self.factory = factory
+        self.size = size
+        self._idle = asyncio.Queue(maxsize=size)
+        self._created = 0
+        self._waiting = 0
+        self._in_use = 0
+        self._checkouts = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+        self._reset_failures = 0
+
+    def warm(self):
+        """Build every team up front so the first requests don't pay for it"""
+        while self._created < self.size:
+            self._idle.put_nowait(self.factory())
+            self._created += 1
+        logger.info(f"Team pool '{self.name}' warmed with {self.size} teams")
+
+    async def checkout(self):
+        """Wait for an idle team and hand it to the caller"""
+        started = time.perf_counter()
+        self._waiting += 1
+        try:
+            if self._idle.empty() and self._created < self.size:
+                team = self.factory()
+                self._created += 1
+            else:
+                team = await self._idle.get()
+        finally:
+            self._waiting -= 1
+
+        waited = time.perf_counter() - started
+        self._in_use += 1
+        self._checkouts += 1
+        self._total_wait += waited
+        self._max_wait = max(self._max_wait, waited)
+        return team
+
+    async def checkin(self, team, reset: bool = True):
+        """Return a team to the pool, clearing its conversation first"""
+        self._in_use -= 1
+        if reset:
+            team = await self._reset(team)
+        if team is not None:
+            self._idle.put_nowait(team)
+
+    async def _reset(self, team):
+        """Reset a team, rebuilding it if the reset fails; None if the rebuild fails too"""
+        try:
+            await team.reset()
+            return team
+        except Exception as e:
+            # A team that can't be reset may carry stale state; replace it
+            logger.warning(f"Team pool '{self.name}' reset failed, rebuilding team: {e}")
+            self._reset_failures += 1
+        try:
+            return self.factory()
+        except Exception as e:
+            # Free the slot so a later checkout builds the team again
+            logger.error(f"Team pool '{self.name}' could not rebuild team: {e}")
+            self._created -= 1
+            return None
+
+    @asynccontextmanager
+    async def lease(self, reset: bool = True):
+        """Context manager wrapping checkout/checkin around one request"""
+        team = await self.checkout()
+        try:
+            yield team
+        finally:
+            await self.checkin(team, reset=reset)
+
+    async def reset_idle(self):
+        """Reset every team currently sitting idle in the pool"""
+        teams = []
+        while not self._idle.empty():
+            teams.append(self._idle.get_nowait())
+        for team in teams:
+            team = await self._reset(team)
+            if team is not None:
+                self._idle.put_nowait(team)
+
+    def metrics(self):
+        """Snapshot of pool occupancy and wait times"""
+        return {
+            "size": self.size,
+            "created": self._created,
+            "idle": self._idle.qsize(),
+            "in_use": self._in_use,
+            "queue_depth": self._waiting,
+            "checkouts": self._checkouts,
+            "avg_wait_ms": round(self._total_wait / self._checkouts * 1000, 3) if self._checkouts else 0.0,
+            "max_wait_ms": round(self._max_wait * 1000, 3),
+            "reset_failures": self._reset_failures,
+        }
@@ -0,0 +1,157 @@
+import csv
+import io
+import json
+import re
+import threading
+from typing import List, Tuple
+
+import numpy as np
+
+from tool.plot_data import PlotDataError, to_numeric
+from tool.plotting import (
+    create_bar_chart, create_histogram, create_line_chart, create_pie_chart, create_scatter_plot
+)
+
+_CHART_ALIASES = {
+    "bar": "bar", "bar chart": "bar", "bar_chart": "bar", "column": "bar",
+    "pie": "pie", "pie chart": "pie", "pie_chart": "pie", "donut": "pie",
+    "line": "line", "line chart": "line", "line_chart": "line",
+    "scatter": "scatter", "scatter plot": "scatter", "scatter_plot": "scatter",
+    "histogram": "histogram", "hist": "histogram",
+}
+
+
+class ChartInferenceError(ValueError):
+    """The data or chart type can't be mapped to a plotting call without the agent"""
+
+
+def normalize_chart_type(chart_type: str) -> str:
+    kind = _CHART_ALIASES.get(chart_type.strip().lower())
+    if kind is None:
+        raise ChartInferenceError(f"Unknown chart type '{chart_type}'")
+    return kind
+
+
+def parse_table(data: str) -> Tuple[List[str], List[np.ndarray]]:
+    """Column names and column arrays from JSON (records, rows, columns or a stored query result) or CSV"""
+    text = data.strip()
+    try:
+        parsed = json.loads(text)
+    except ValueError:
+        parsed = None
+
+    if parsed is None:
+        rows = list(csv.reader(io.StringIO(text)))
+        if len(rows) < 2:
+            raise ChartInferenceError("Data is neither JSON nor CSV with a header row")
+        columns, rows = rows[0], rows[1:]
+    elif isinstance(parsed, dict) and "columns" in parsed and "rows" in parsed:
+        columns, rows = parsed["columns"], parsed["rows"]
+    elif isinstance(parsed, dict) and parsed and all(isinstance(v, list) for v in parsed.values()):
+        columns = list(parsed)
+        return columns, [np.asarray(parsed[name], dtype=object) for name in columns]
+    elif isinstance(parsed, list) and parsed and all(isinstance(r, dict) for r in parsed):
+        columns = list(dict.fromkeys(key for record in parsed for key in record))
+        rows = [[record.get(name) for name in columns] for record in parsed]
+    elif isinstance(parsed, list) and parsed and all(isinstance(r, list) for r in parsed):
+        columns = [f"column_{i + 1}" for i in range(max(len(r) for r in parsed))]
+        rows = parsed
+    else:
+        raise ChartInferenceError("Unrecognised data layout")
+
+    if not rows:
+        raise ChartInferenceError("Data has no rows")
+    if any(len(row) != len(columns) for row in rows):
+        raise ChartInferenceError("Rows do not all have the same number of columns as the header")
+    table = np.array(rows, dtype=object)
+    return [str(name) for name in columns], [table[:, i] for i in range(len(columns))]
+
+
+def _numeric_columns(columns, arrays) -> dict:
+    """Columns that convert to floats; null and empty cells count as missing, not as labels"""
+    numeric = {}
+    for name, values in zip(columns, arrays):
+        values = np.where(np.isin(values, [None, ""]), np.nan, values)
+        try:
+            converted = to_numeric(values)
+        except PlotDataError:
+            continue
+        if np.isfinite(converted).any():
+            numeric[name] = converted
+    return numeric
+
+
+def _by_mention(names: List[str], query: str) -> List[str]:
+    """Columns named in the request first, otherwise table order"""
+    words = set(re.findall(r"[a-z0-9]+", query.lower()))
+    mentioned = lambda name: bool(set(re.findall(r"[a-z0-9]+", name.lower())) & words)
+    return sorted(names, key=lambda name: not mentioned(name))
+
+
+def infer_chart_call(chart_type: str, data: str, query: str = ""):
+    """Pick the plotting function and its arguments for structured data; raises ChartInferenceError"""
+    kind = normalize_chart_type(chart_type)
+    columns, arrays = parse_table(data)
+    numeric = _numeric_columns(columns, arrays)
+    labels = [name for name in columns if name not in numeric]
+    values = _by_mention(list(numeric), query)
+
+    if kind in ("bar", "pie"):
+        label = _by_mention(labels, query)[0] if labels else (columns[0] if len(numeric) > 1 else None)
+        value = next((name for name in values if name != label), None)
+        if label is None or value is None:
+            raise ChartInferenceError(f"A {kind} chart needs a label column and a numeric column")
+        payload = {"label": arrays[columns.index(label)].astype(str), "value": numeric[value]}
+        if kind == "pie":
+            return create_pie_chart, {"data": payload, "title": f"{value} by {label}"}
+        return create_bar_chart, {"data": payload, "title": f"{value} by {label}", "xlabel": label, "ylabel": value}
+
+    if kind == "histogram":
+        if not values:
+            raise ChartInferenceError("A histogram needs a numeric column")
+        return create_histogram, {"data": {"values": numeric[values[0]]}, "title": f"Distribution of {values[0]}", "xlabel": values[0]}
+
+    # Line and scatter: the first two numeric columns in table order, preferring ones the request names
+    if len(values) < 2:
+        raise ChartInferenceError(f"A {kind} chart needs two numeric columns")
+    x, y = sorted(values[:2], key=columns.index)
+    function = create_line_chart if kind == "line" else create_scatter_plot
+    return function, {"data": {"x": numeric[x], "y": numeric[y]}, "title": f"{y} vs {x}", "xlabel": x, "ylabel": y}
+
+
+async def create_chart_direct(chart_type: str, data: str, query: str = "") -> dict:
+    """Render without the agent; raises ChartInferenceError when the agent is needed after all"""
+    function, arguments = infer_chart_call(chart_type, data, query)
+    result = await function(**arguments)
+    if "error" in result:
+        raise ChartInferenceError(result["error"])
+    return result
+
+
+class PathLatency:
+    """Latency per visualization path (direct vs agent)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def record(self, path: str, seconds: float):
+        with self._lock:
+            stats = self._stats.setdefault(path, {"count": 0, "total": 0.0, "max": 0.0})
+            stats["count"] += 1
+            stats["total"] += seconds
+            stats["max"] = max(stats["max"], seconds)
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return {
+                path: {
+                    "count": stats["count"],
+                    "avg_ms": round(stats["total"] / stats["count"] * 1000, 3),
+                    "max_ms": round(stats["max"] * 1000, 3),
+                }
+                for path, stats in self._stats.items()
+            }
+
+
+visualization_latency = PathLatency()
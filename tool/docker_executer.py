@@ -1,22 +1,256 @@
-
+import asyncio
+import hashlib
+import json
+import logging
+import re
+import shlex
+import subprocess
+import sys
+import threading
+import time
 import venv
 from pathlib import Path
+from types import SimpleNamespace
+from typing import Dict, List, Optional
 
 from autogen_core import CancellationToken
 from autogen_core.code_executor import CodeBlock
 from autogen_ext.code_executors.local import LocalCommandLineCodeExecutor
+from autogen_ext.code_executors._common import CommandLineCodeResult
+
+from config import get_code_executor_settings
 
-work_dir = Path("coding")
+logger = logging.getLogger(__name__)
+
+settings = get_code_executor_settings()
+work_dir = Path(settings["work_dir"])
 work_dir.mkdir(exist_ok=True)
 
-venv_dir = work_dir / ".venv"
-venv_builder = venv.EnvBuilder(with_pip=True)
-venv_builder.create(venv_dir)
-venv_context = venv_builder.ensure_directories(venv_dir)
 
-local_executor = LocalCommandLineCodeExecutor(work_dir=work_dir, virtual_env_context=venv_context)
+_PIP_INSTALL = re.compile(r"^\s*!?\s*(?:python3?\s+-m\s+)?pip3?\s+install\s+(.*)$")
+SHELL_LANGUAGES = {"bash", "shell", "sh", "zsh"}
+
+
+def _pip_only_requirements(code_block: CodeBlock) -> Optional[List[str]]:
+    """Requirements of a shell block that does nothing but plain `pip install`, else None"""
+    if code_block.language.lower() not in SHELL_LANGUAGES:
+        return None
+    requirements = []
+    for line in code_block.code.splitlines():
+        if not line.strip() or line.strip().startswith("#"):
+            continue
+        match = _PIP_INSTALL.match(line)
+        if not match:
+            return None
+        try:
+            arguments = shlex.split(match.group(1))
+        except ValueError:
+            return None
+        for argument in arguments:
+            if argument in ("-q", "--quiet", "-qq"):
+                continue
+            if argument.startswith("-"):
+                # -U, -r, --index-url and friends ask for more than "is it installed"
+                return None
+            requirements.append(argument)
+    return requirements or None
+
+
+class CodeEnvironment:
+    """Virtualenv that code blocks run in, built on first use and reused while it still matches"""
+
+    STAMP = "autoinsight-env.json"
+    ANALYSIS_SECTION = "analysis libraries"
+    # Seconds before a failed build is retried, doubling per failure up to the maximum
+    RETRY_BACKOFF = 30
+    MAX_RETRY_BACKOFF = 600
+
+    def __init__(self, venv_dir, requirements: Optional[str] = None, wheelhouse: Optional[str] = None):
+        self.venv_dir = Path(venv_dir)
+        self.requirements = Path(requirements) if requirements else None
+        self.wheelhouse = Path(wheelhouse) if wheelhouse else None
+        self.timings = {}
+        self._lock = threading.Lock()
+        self._context: Optional[SimpleNamespace] = None
+        self._task: Optional[asyncio.Task] = None
+        self._packages: Optional[Dict[str, str]] = None
+        self._analysis_packages: Dict[str, str] = {}
+        self._failure: Optional[Exception] = None
+        self._failures = 0
+        self._retry_at = 0.0
+
+    def fingerprint(self) -> dict:
+        """What the venv was built from; a mismatch means it has to be rebuilt"""
+        requirements = self.requirements.read_bytes() if self.requirements and self.requirements.exists() else b""
+        return {
+            "python": sys.version,
+            "base_executable": sys._base_executable,
+            "requirements_sha256": hashlib.sha256(requirements).hexdigest(),
+        }
+
+    def _is_current(self, context: SimpleNamespace) -> bool:
+        stamp = self.venv_dir / self.STAMP
+        try:
+            return Path(context.env_exe).exists() and json.loads(stamp.read_text()) == self.fingerprint()
+        except (OSError, ValueError):
+            return False
+
+    def ensure(self) -> SimpleNamespace:
+        """Blocking and idempotent: reuse a matching venv, otherwise build it and install requirements"""
+        with self._lock:
+            if self._context is not None:
+                return self._context
+            if self._failure is not None and time.monotonic() < self._retry_at:
+                raise RuntimeError(
+                    f"Code environment {self.venv_dir} failed to build ({self._failure}); "
+                    f"retrying in {self._retry_at - time.monotonic():.0f}s"
+                ) from self._failure
+            try:
+                context = self._build()
+            except Exception as e:
+                # Rebuilding with clear=True on every call would repeat a slow failure; back off instead
+                self._failures += 1
+                self._failure = e
+                self._retry_at = time.monotonic() + min(self.RETRY_BACKOFF * 2 ** (self._failures - 1), self.MAX_RETRY_BACKOFF)
+                logger.error(f"Code environment {self.venv_dir} build failed (attempt {self._failures}): {e}")
+                raise
+            self._failure = None
+            self._failures = 0
+            self._context = context
+            return context
+
+    def _build(self) -> SimpleNamespace:
+        """Reuse the venv if its stamp matches, otherwise recreate it and install the lock file"""
+        started = time.perf_counter()
+        context = venv.EnvBuilder().ensure_directories(self.venv_dir)
+        if self._is_current(context):
+            self.timings = {"check_ms": round((time.perf_counter() - started) * 1000, 3), "reused": True}
+            logger.info(f"Code environment {self.venv_dir} is current, reusing it ({self.timings})")
+        else:
+            venv.EnvBuilder(with_pip=True, clear=True).create(self.venv_dir)
+            created = time.perf_counter()
+            if self.requirements and self.requirements.exists():
+                command = [context.env_exe, "-m", "pip", "install", "--quiet", "-r", str(self.requirements)]
+                if self.wheelhouse and self.wheelhouse.is_dir():
+                    # Pinned wheels built into the image; no network needed
+                    command += ["--no-index", "--find-links", str(self.wheelhouse)]
+                else:
+                    logger.warning(f"No wheelhouse at {self.wheelhouse}, installing {self.requirements} from the package index")
+                subprocess.run(command, check=True)
+            installed = time.perf_counter()
+            # Written last so an interrupted build is never mistaken for a good one
+            (self.venv_dir / self.STAMP).write_text(json.dumps(self.fingerprint()))
+            self.timings = {
+                "create_ms": round((created - started) * 1000, 3),
+                "install_ms": round((installed - created) * 1000, 3),
+                "reused": False,
+            }
+            logger.info(f"Code environment {self.venv_dir} built ({self.timings})")
+        return context
+
+    def _read_requirements(self):
+        """Parse the lock file once into all pins and the top-level analysis libraries"""
+        packages = {}
+        analysis = {}
+        section = None
+        if self.requirements and self.requirements.exists():
+            for line in self.requirements.read_text().splitlines():
+                if line.startswith("#"):
+                    section = line.lstrip("# ").lower()
+                    continue
+                name, _, version = line.split("#")[0].strip().partition("==")
+                if name and version:
+                    packages[_normalize(name)] = version.strip()
+                    if section == self.ANALYSIS_SECTION:
+                        analysis[_normalize(name)] = version.strip()
+        self._packages = packages
+        self._analysis_packages = analysis
+
+    def packages(self) -> Dict[str, str]:
+        """Pinned name -> version from the requirements lock file"""
+        if self._packages is None:
+            self._read_requirements()
+        return self._packages
+
+    def analysis_packages(self) -> Dict[str, str]:
+        """The lock file's "# Analysis libraries" section: what the model is told it can import"""
+        if self._packages is None:
+            self._read_requirements()
+        return self._analysis_packages
+
+    def satisfies(self, requirement: str) -> bool:
+        """True if a pip requirement like 'pandas' or 'numpy==2.3.0' is already pinned in the venv"""
+        match = re.fullmatch(r"([A-Za-z0-9][A-Za-z0-9._-]*)(?:\[[^\]]*\])?\s*(?:==\s*([^\s,;]+))?", requirement.strip())
+        if not match:
+            return False
+        version = self.packages().get(_normalize(match.group(1)))
+        return version is not None and match.group(2) in (None, version)
+
+    def already_installed(self, code_blocks: List[CodeBlock]) -> Optional[str]:
+        """pip's answer when the blocks only pip install packages the venv already pins, else None"""
+        satisfied = []
+        for code_block in code_blocks:
+            requirements = _pip_only_requirements(code_block)
+            if requirements is None or not all(self.satisfies(r) for r in requirements):
+                return None
+            satisfied.extend(requirements)
+        return "".join(f"Requirement already satisfied: {r}\n" for r in satisfied) or None
+
+    async def ready(self) -> SimpleNamespace:
+        """The venv context, building it in a thread if nobody has yet"""
+        if self._context is not None:
+            return self._context
+        return await asyncio.to_thread(self.ensure)
+
+    def provision_in_background(self) -> asyncio.Task:
+        """Start building at startup so the first analysis doesn't wait for it"""
+        if self._task is None:
+            self._task = asyncio.create_task(self.ready())
+            self._task.add_done_callback(self._log_failure)
+        return self._task
+
+    @staticmethod
+    def _log_failure(task: asyncio.Task):
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Code environment provisioning failed: {task.exception()}")
+
+    def metrics(self) -> dict:
+        return {
+            "venv_dir": str(self.venv_dir),
+            "ready": self._context is not None,
+            "error": str(self._failure) if self._failure is not None else None,
+            "failures": self._failures,
+            **self.timings,
+        }
+
+
+def _normalize(name: str) -> str:
+    return re.sub(r"[-_.]+", "-", name).lower()
+
+
+code_environment = CodeEnvironment(settings["venv_dir"], settings["requirements"], settings["wheelhouse"])
+
+class LazyVenvCodeExecutor(LocalCommandLineCodeExecutor):
+    """LocalCommandLineCodeExecutor that waits for the shared venv before running its first block"""
+
+    def __init__(self, environment: CodeEnvironment, **kwargs):
+        super().__init__(**kwargs)
+        self._environment = environment
+
+    async def start(self) -> None:
+        self._virtual_env_context = await self._environment.ready()
+        await super().start()
+
+    async def execute_code_blocks(self, code_blocks: List[CodeBlock], cancellation_token: CancellationToken) -> CommandLineCodeResult:
+        if self._virtual_env_context is None:
+            self._virtual_env_context = await self._environment.ready()
 
+        # pip installs of packages the venv already pins are answered without running pip
+        output = self._environment.already_installed(code_blocks)
+        if output is not None:
+            return CommandLineCodeResult(exit_code=0, output=output, code_file=None)
+        return await super().execute_code_blocks(code_blocks, cancellation_token)
 
 
 def create_docker_cmd_code_excuter():
-    return LocalCommandLineCodeExecutor(work_dir=work_dir, virtual_env_context=venv_context)
+    return LazyVenvCodeExecutor(code_environment, work_dir=work_dir)
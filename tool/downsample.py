@@ -0,0 +1,96 @@
+from typing import Tuple
+
+import numpy as np
+
+
+def _drop_non_finite(x: np.ndarray, y: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    keep = np.isfinite(x) & np.isfinite(y)
+    if keep.all():
+        return x, y
+    return x[keep], y[keep]
+
+
+def lttb(x: np.ndarray, y: np.ndarray, threshold: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Largest-Triangle-Three-Buckets: keep the points that preserve the line's visual shape"""
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return x, y
+
+    # First and last points are kept; the rest is split into threshold - 2 buckets
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    previous = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+        # Twice the area of the triangle (previous point, candidate, next bucket's average)
+        area = np.abs(
+            (x[previous] - avg_x) * (y[start:end] - y[previous])
+            - (x[previous] - x[start:end]) * (avg_y - y[previous])
+        )
+        previous = start + int(area.argmax())
+        selected[i + 1] = previous
+    return x[selected], y[selected]
+
+
+def stratified_sample(x: np.ndarray, y: np.ndarray, max_points: int, bins: int = 64, seed: int = 0):
+    """Random sample that keeps at least one point in every occupied cell of a bins x bins grid,
+    so sparse regions and outliers survive. Seeded, so the same data always gives the same chart."""
+    n = len(x)
+    if n <= max_points:
+        return x, y
+
+    def cell_index(values):
+        low, high = values.min(), values.max()
+        span = high - low or 1.0
+        return np.minimum(((values - low) / span * bins).astype(np.int64), bins - 1)
+
+    cells = cell_index(x) * bins + cell_index(y)
+    order = np.random.default_rng(seed).permutation(n)
+    order = order[np.argsort(cells[order], kind="stable")]
+    sorted_cells = cells[order]
+
+    # Rank of each point inside its cell (random, thanks to the permutation above)
+    starts = np.flatnonzero(np.r_[True, sorted_cells[1:] != sorted_cells[:-1]])
+    counts = np.diff(np.r_[starts, n])
+    rank = np.arange(n) - np.repeat(starts, counts)
+    # One point per occupied cell, the remaining budget shared in proportion to cell size
+    spare = max(0, max_points - len(starts))
+    quota = 1 + np.floor(counts * spare / n).astype(np.int64)
+    keep = order[rank < np.repeat(quota, counts)]
+    keep.sort()
+    return x[keep], y[keep]
+
+
+def density_grid(x: np.ndarray, y: np.ndarray, bins: int = 200) -> dict:
+    """2-D histogram of the points, drawn instead of the points themselves"""
+    counts, x_edges, y_edges = np.histogram2d(x, y, bins=bins)
+    return {"counts": counts.T, "x_edges": x_edges, "y_edges": y_edges}
+
+
+def reduce_line(x: np.ndarray, y: np.ndarray, max_points: int):
+    """Finite line data, sorted by x and reduced with LTTB above max_points; returns (x, y, method).
+    Series that fit are drawn in their original order"""
+    x, y = _drop_non_finite(x, y)
+    if len(x) <= max_points:
+        return x, y, None
+    if np.any(np.diff(x) < 0):
+        order = np.argsort(x, kind="stable")
+        x, y = x[order], y[order]
+    x, y = lttb(x, y, max_points)
+    return x, y, "lttb"
+
+
+def reduce_scatter(x: np.ndarray, y: np.ndarray, max_points: int, method: str = "density"):
+    """Scatter data above max_points becomes a density grid or a stratified sample"""
+    x, y = _drop_non_finite(x, y)
+    if len(x) <= max_points:
+        return {"x": x, "y": y}, None
+    if method == "sample":
+        x, y = stratified_sample(x, y, max_points)
+        return {"x": x, "y": y}, "sample"
+    return {"density": density_grid(x, y)}, "density"
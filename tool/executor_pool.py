@@ -0,0 +1,274 @@
+import asyncio
+import logging
+import os
+import shutil
+import time
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Callable, List, Optional
+
+from autogen_core import CancellationToken
+from autogen_core.code_executor import CodeBlock, CodeExecutor, CodeResult
+
+from config import get_code_executor_settings
+from tool.docker_executer import LazyVenvCodeExecutor, code_environment, work_dir
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# ioctl that asks Linux filesystems such as btrfs and XFS for a copy-on-write clone of a file
+FICLONE = 0x40049409
+
+# Set by the request handler while it holds a lease; PooledCodeExecutor runs code on it
+current_code_executor: ContextVar[Optional[CodeExecutor]] = ContextVar("current_code_executor", default=None)
+
+
+class PooledCodeExecutor(CodeExecutor):
+    """Stand-in given to a pooled team's CodeExecutorAgent; runs code on the executor leased for the request"""
+
+    async def execute_code_blocks(self, code_blocks: List[CodeBlock], cancellation_token: CancellationToken) -> CodeResult:
+        executor = current_code_executor.get()
+        if executor is None:
+            raise RuntimeError("No code executor is leased for this request")
+        return await executor.execute_code_blocks(code_blocks, cancellation_token)
+
+    # The pool starts, stops and recycles the real executors
+    async def start(self) -> None:
+        pass
+
+    async def stop(self) -> None:
+        pass
+
+    async def restart(self) -> None:
+        pass
+
+
+def _clone(source: Path, target: Path):
+    """Copy a file, sharing its blocks copy-on-write where the filesystem supports it"""
+    if fcntl is not None:
+        try:
+            with open(source, "rb") as src, open(target, "wb") as dst:
+                fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+            shutil.copystat(source, target)
+            return
+        except OSError:
+            target.unlink(missing_ok=True)
+    shutil.copy2(source, target)
+
+
+def _move(source: Path, target: Path):
+    """Move a file or directory to target, merging into a directory that is already there"""
+    if source.is_dir() and not source.is_symlink() and target.is_dir():
+        for child in source.iterdir():
+            _move(child, target / child.name)
+        source.rmdir()
+    else:
+        os.replace(source, target)
+
+
+class ExecutorWorker:
+    """A started executor with its own scratch directory"""
+
+    def __init__(self, name: str, directory: Path, executor: CodeExecutor):
+        self.name = name
+        self.directory = directory
+        self.executor = executor
+        self.runs = 0
+        self.created = time.monotonic()
+        self.failed = False
+        self._staged = set()
+
+    def mark_failed(self):
+        """Flag a run that failed without raising through the lease, so checkin health-checks the worker"""
+        self.failed = True
+
+    def stage(self, path) -> Path:
+        """Copy an input file into the scratch directory, so the run can't modify the original"""
+        source = Path(path)
+        target = self.directory / source.name
+        if not target.exists():
+            _clone(source, target)
+        self._staged.add(target.name)
+        return target
+
+    def collect(self, destination: Path) -> List[str]:
+        """Move files and directories the run produced out of the scratch directory and drop the staged inputs"""
+        produced = []
+        for entry in self.directory.iterdir():
+            if entry.name in self._staged:
+                entry.unlink()
+            else:
+                _move(entry, destination / entry.name)
+                produced.append(entry.name)
+        self._staged.clear()
+        return produced
+
+
+class ExecutorPool:
+    """Pre-started code executors, each in its own scratch directory, leased out one request at a time"""
+
+    def __init__(self, factory: Callable[[Path], CodeExecutor], root: Path, collect_dir: Path,
+                 size: int = 2, max_runs: int = 20):
+        if size < 1:
+            raise ValueError("Executor pool size must be at least 1")
+        self.factory = factory
+        self.root = Path(root)
+        self.collect_dir = Path(collect_dir)
+        self.size = size
+        self.max_runs = max_runs
+        self._idle: Optional[asyncio.Queue] = None
+        self._lock = asyncio.Lock()
+        self._created = 0
+        self._next_id = 0
+        self._in_use = 0
+        self._waiting = 0
+        self._checkouts = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+        self._recycled = 0
+        self._failures = 0
+
+    async def _create(self) -> ExecutorWorker:
+        self._next_id += 1
+        name = f"worker-{self._next_id}"
+        directory = self.root / name
+        await asyncio.to_thread(shutil.rmtree, directory, True)
+        directory.mkdir(parents=True)
+        executor = self.factory(directory)
+        await executor.start()
+        worker = ExecutorWorker(name, directory, executor)
+        if not await self._probe(worker):
+            await executor.stop()
+            raise RuntimeError(f"Code executor {name} failed its health check")
+        return worker
+
+    async def _probe(self, worker: ExecutorWorker) -> bool:
+        """Run a trivial block to prove the executor and its venv work"""
+        try:
+            result = await worker.executor.execute_code_blocks(
+                [CodeBlock(code="print('ok')", language="python")], CancellationToken()
+            )
+            return result.exit_code == 0 and "ok" in result.output
+        except Exception as e:
+            logger.warning(f"Code executor {worker.name} health check raised: {e}")
+            return False
+
+    async def _retire(self, worker: ExecutorWorker):
+        try:
+            await worker.executor.stop()
+        finally:
+            await asyncio.to_thread(shutil.rmtree, worker.directory, True)
+
+    async def start(self):
+        """Create and health-check every worker up front; safe to call more than once"""
+        async with self._lock:
+            if self._idle is None:
+                self._idle = asyncio.Queue(maxsize=self.size)
+            while self._created < self.size:
+                self._idle.put_nowait(await self._create())
+                self._created += 1
+        logger.info(f"Code executor pool started with {self.size} workers")
+
+    async def checkout(self) -> ExecutorWorker:
+        """Wait for an idle worker, replacing it first if it has gone bad"""
+        started = time.perf_counter()
+        if self._idle is None or (self._idle.empty() and self._created < self.size):
+            await self.start()
+        self._waiting += 1
+        try:
+            worker = await self._idle.get()
+        finally:
+            self._waiting -= 1
+        if not worker.directory.is_dir():
+            logger.warning(f"Code executor {worker.name} lost its scratch directory, replacing it")
+            self._recycled += 1
+            await self._retire(worker)
+            try:
+                worker = await self._create()
+            except Exception:
+                self._created -= 1
+                raise
+
+        waited = time.perf_counter() - started
+        self._in_use += 1
+        self._checkouts += 1
+        self._total_wait += waited
+        self._max_wait = max(self._max_wait, waited)
+        return worker
+
+    async def checkin(self, worker: ExecutorWorker, failed: bool = False, destination: Optional[Path] = None):
+        """Collect the run's output files into destination (collect_dir by default), then return the worker or replace it after failures or max_runs"""
+        self._in_use -= 1
+        worker.runs += 1
+        failed, worker.failed = failed or worker.failed, False
+        try:
+            await asyncio.to_thread(worker.collect, destination or self.collect_dir)
+        except OSError as e:
+            logger.warning(f"Code executor {worker.name} scratch cleanup failed: {e}")
+            failed = True
+        if failed:
+            self._failures += 1
+            failed = not await self._probe(worker)
+        if failed or worker.runs >= self.max_runs:
+            self._recycled += 1
+            await self._retire(worker)
+            try:
+                worker = await self._create()
+            except Exception as e:
+                # The slot is freed so the next checkout builds a worker again
+                logger.error(f"Code executor replacement failed: {e}")
+                self._created -= 1
+                return
+        self._idle.put_nowait(worker)
+
+    @asynccontextmanager
+    async def lease(self, destination: Optional[Path] = None):
+        """Context manager wrapping checkout/checkin around one request; publishes the executor as current_code_executor"""
+        worker = await self.checkout()
+        current_code_executor.set(worker.executor)
+        failed = False
+        try:
+            yield worker
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            current_code_executor.set(None)
+            await self.checkin(worker, failed=failed, destination=destination)
+
+    async def shutdown(self):
+        if self._idle is None:
+            return
+        while not self._idle.empty():
+            await self._retire(self._idle.get_nowait())
+
+    def metrics(self) -> dict:
+        """Snapshot of pool occupancy, wait times and recycling"""
+        return {
+            "size": self.size,
+            "created": self._created,
+            "idle": self._idle.qsize() if self._idle is not None else 0,
+            "in_use": self._in_use,
+            "queue_depth": self._waiting,
+            "checkouts": self._checkouts,
+            "avg_wait_ms": round(self._total_wait / self._checkouts * 1000, 3) if self._checkouts else 0.0,
+            "max_wait_ms": round(self._max_wait * 1000, 3),
+            "max_runs": self.max_runs,
+            "recycled": self._recycled,
+            "failures": self._failures,
+        }
+
+
+settings = get_code_executor_settings()
+executor_pool = ExecutorPool(
+    lambda directory: LazyVenvCodeExecutor(code_environment, work_dir=directory),
+    root=work_dir / "workers",
+    collect_dir=work_dir,
+    size=settings["pool_size"],
+    max_runs=settings["max_runs"],
+)
@@ -0,0 +1,252 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Callable, List
+
+from autogen_core import CancellationToken
+from autogen_core.code_executor import CodeBlock
+from autogen_ext.code_executors.jupyter import JupyterCodeExecutor, JupyterCodeResult
+from jupyter_client import AsyncKernelManager
+from jupyter_client.kernelspec import KernelSpecManager
+from nbclient import NotebookClient
+from nbclient.exceptions import DeadKernelError
+from nbformat import v4 as nbformat
+
+from config import get_code_executor_settings
+from tool.docker_executer import SHELL_LANGUAGES, CodeEnvironment, code_environment
+
+logger = logging.getLogger(__name__)
+
+KERNEL_NAME = "autoinsight-analysis"
+
+
+def _kernel_spec_dir(context) -> Path:
+    """Kernelspec that starts ipykernel with the analysis venv's interpreter"""
+    kernels = Path(context.env_dir) / "share" / "jupyter" / "kernels"
+    spec_file = kernels / KERNEL_NAME / "kernel.json"
+    spec = {
+        "argv": [os.path.abspath(context.env_exe), "-m", "ipykernel_launcher", "-f", "{connection_file}"],
+        "display_name": "AutoInsight analysis",
+        "language": "python",
+        # Charts are saved to files, never shown
+        "env": {"MPLBACKEND": "Agg"},
+    }
+    if not spec_file.exists() or json.loads(spec_file.read_text()) != spec:
+        spec_file.parent.mkdir(parents=True, exist_ok=True)
+        spec_file.write_text(json.dumps(spec))
+    return kernels
+
+
+class KernelCodeExecutor(JupyterCodeExecutor):
+    """Stateful executor on an IPython kernel in the analysis venv, so loaded data survives between code blocks"""
+
+    def __init__(self, environment: CodeEnvironment, work_dir: Path, memory_limit_mb: int = 4096, timeout: int = 60):
+        super().__init__(kernel_name=KERNEL_NAME, timeout=timeout, output_dir=work_dir)
+        self._environment = environment
+        self.work_dir = Path(work_dir)
+        self.memory_limit_mb = memory_limit_mb
+        self.last_used = time.monotonic()
+        self.restarts = 0
+
+    @property
+    def running(self) -> bool:
+        return self._started
+
+    async def start(self) -> None:
+        if self._started:
+            return
+        context = await self._environment.ready()
+        kernels = await asyncio.to_thread(_kernel_spec_dir, context)
+        km = AsyncKernelManager(kernel_name=KERNEL_NAME, kernel_spec_manager=KernelSpecManager(kernel_dirs=[str(kernels)]))
+        # Started piecewise rather than with async_setup_kernel, which installs signal handlers on the server's loop
+        self._client = NotebookClient(nb=nbformat.new_notebook(), km=km, timeout=self._timeout, allow_errors=True)
+        env = os.environ.copy()
+        # Shell blocks run through %%bash and should find the venv's pip first
+        env["PATH"] = f"{os.path.abspath(context.bin_path)}{os.pathsep}{env.get('PATH', '')}"
+        await self._client.async_start_new_kernel(cwd=str(self.work_dir.resolve()), env=env)
+        await self._client.async_start_new_kernel_client()
+        self._started = True
+        await self._execute_cell(nbformat.new_code_cell(
+            "try:\n"
+            "    import resource as _resource\n"
+            f"    _resource.setrlimit(_resource.RLIMIT_AS, ({self.memory_limit_mb} * 1024 * 1024,) * 2)\n"
+            "    del _resource\n"
+            "except (ImportError, ValueError, OSError):\n"
+            "    pass"
+        ))
+
+    async def stop(self) -> None:
+        if not self._started:
+            return
+        client, self._client = self._client, None
+        self._started = False
+        try:
+            if await client.km.is_alive():
+                await client.km.shutdown_kernel(now=True)
+        finally:
+            await client.km.cleanup_resources()
+            if client.kc is not None:
+                client.kc.stop_channels()
+
+    async def move_to(self, work_dir: Path):
+        """Point the running kernel at another directory without losing its variables"""
+        self.work_dir = Path(work_dir)
+        self._output_dir = self.work_dir
+        await self._execute_cell(nbformat.new_code_cell(f"import os as _os; _os.chdir({str(self.work_dir.resolve())!r}); del _os"))
+
+    async def execute_code_blocks(self, code_blocks: List[CodeBlock], cancellation_token: CancellationToken) -> JupyterCodeResult:
+        self.last_used = time.monotonic()
+        output = self._environment.already_installed(code_blocks)
+        if output is not None:
+            return JupyterCodeResult(exit_code=0, output=output, output_files=[])
+        if not self._started:
+            await self.start()
+
+        # Every block runs as a cell; shell blocks through the %%bash cell magic
+        cells = [
+            CodeBlock(code=f"%%bash\n{block.code}", language="python") if block.language.lower() in SHELL_LANGUAGES else block
+            for block in code_blocks
+        ]
+        try:
+            return await super().execute_code_blocks(cells, cancellation_token)
+        except asyncio.TimeoutError:
+            # The cell keeps running in the kernel until interrupted
+            await self._client.km.interrupt_kernel()
+            return JupyterCodeResult(exit_code=124, output=f"Timeout after {self._timeout}s; the cell was interrupted", output_files=[])
+        except DeadKernelError:
+            self.restarts += 1
+            await self.stop()
+            await self.start()
+            return JupyterCodeResult(
+                exit_code=1,
+                output=(
+                    f"The Python kernel died (it may have exceeded its {self.memory_limit_mb} MB memory limit) "
+                    "and was restarted; earlier variables and loaded data are gone and must be recreated"
+                ),
+                output_files=[],
+            )
+
+
+class _Kernel:
+    """Slot for one analysis session's kernel"""
+
+    def __init__(self, executor: KernelCodeExecutor):
+        self.executor = executor
+        self.lock = asyncio.Lock()
+        self.active = 0
+
+
+class KernelRegistry:
+    """Kernels kept per analysis session in LRU order, shut down when idle or over the limit"""
+
+    def __init__(self, factory: Callable[[Path], KernelCodeExecutor], max_kernels: int = 8, idle_ttl: float = 600):
+        self.factory = factory
+        self.max_kernels = max_kernels
+        self.idle_ttl = idle_ttl
+        self._kernels = OrderedDict()
+        self._lock = asyncio.Lock()
+        self._stats = {"hits": 0, "started": 0, "reaped": 0, "evicted": 0}
+
+    async def _load(self, session_id: str, work_dir: Path) -> _Kernel:
+        async with self._lock:
+            kernel = self._kernels.get(session_id)
+            if kernel is not None:
+                self._kernels.move_to_end(session_id)
+                self._stats["hits"] += 1
+            else:
+                kernel = _Kernel(self.factory(work_dir))
+                self._kernels[session_id] = kernel
+                self._stats["started"] += 1
+            kernel.active += 1
+            return kernel
+
+    @asynccontextmanager
+    async def acquire(self, session_id: str, work_dir: Path):
+        """The session's kernel, started or moved to work_dir"""
+        kernel = await self._load(session_id, work_dir)
+        try:
+            async with kernel.lock:
+                if kernel.executor.running:
+                    await kernel.executor.move_to(work_dir)
+                else:
+                    await kernel.executor.start()
+                try:
+                    yield kernel.executor
+                finally:
+                    kernel.executor.last_used = time.monotonic()
+        finally:
+            kernel.active -= 1
+        await self.enforce_limits()
+
+    async def enforce_limits(self):
+        """Shut down kernels idle past their TTL, then least-recently-used ones over max_kernels"""
+        stopping = []
+        async with self._lock:
+            now = time.monotonic()
+            for session_id, kernel in list(self._kernels.items()):
+                if not kernel.active and now - kernel.executor.last_used > self.idle_ttl:
+                    stopping.append(self._pop(session_id, "reaped"))
+
+            for session_id, kernel in list(self._kernels.items()):
+                if len(self._kernels) <= self.max_kernels:
+                    break
+                if not kernel.active:
+                    stopping.append(self._pop(session_id, "evicted"))
+        # Stopped outside the lock so a slow kernel shutdown doesn't hold up other sessions
+        await self._stop(stopping)
+
+    def _pop(self, session_id: str, reason: str):
+        """Remove a kernel from the registry; the caller holds the lock and stops it after releasing it"""
+        self._stats[reason] += 1
+        return session_id, self._kernels.pop(session_id)
+
+    async def _stop(self, kernels):
+        for session_id, kernel in kernels:
+            try:
+                await kernel.executor.stop()
+            except Exception as e:
+                logger.warning(f"Kernel for session {session_id} did not shut down cleanly: {e}")
+
+    async def drop(self, session_id: str) -> bool:
+        async with self._lock:
+            if session_id not in self._kernels:
+                return False
+            stopping = [self._pop(session_id, "reaped")]
+        await self._stop(stopping)
+        return True
+
+    async def run_reaper(self, interval: float = 60):
+        """Background loop that periodically shuts down idle kernels"""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.enforce_limits()
+            except Exception as e:
+                logger.error(f"Kernel registry reaper failed: {e}")
+
+    async def shutdown(self):
+        async with self._lock:
+            stopping = [self._pop(session_id, "reaped") for session_id in list(self._kernels)]
+        await self._stop(stopping)
+
+    def metrics(self) -> dict:
+        return {
+            "running": len(self._kernels),
+            "max_kernels": self.max_kernels,
+            "idle_ttl": self.idle_ttl,
+            "restarts": sum(kernel.executor.restarts for kernel in self._kernels.values()),
+            **self._stats,
+        }
+
+
+settings = get_code_executor_settings()
+kernel_sessions = KernelRegistry(
+    lambda directory: KernelCodeExecutor(code_environment, directory, memory_limit_mb=settings["kernel_memory_mb"]),
+    max_kernels=settings["max_kernels"],
+    idle_ttl=settings["kernel_idle_ttl"],
+) if settings["kernel"] else None
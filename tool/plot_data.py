@@ -0,0 +1,123 @@
+from typing import Tuple
+
+import numpy as np
+
+# Column names accepted in columnar input, in order of preference
+FIRST_COLUMN_KEYS = ("x", "category", "categories", "label", "labels")
+SECOND_COLUMN_KEYS = ("y", "value", "values")
+
+
+class PlotDataError(ValueError):
+    """Chart input that cannot be turned into arrays; the message points at the offending row"""
+
+
+def _is_number(value) -> bool:
+    try:
+        float(value)
+        return True
+    except (TypeError, ValueError):
+        return False
+
+
+_is_number_vec = np.frompyfunc(_is_number, 1, 1)
+_is_pair_vec = np.frompyfunc(lambda row: isinstance(row, (list, tuple)) and len(row) == 2, 1, 1)
+
+
+def to_numeric(values, name: str = "value") -> np.ndarray:
+    """Float array in one conversion; on failure, report the first row that isn't numeric"""
+    try:
+        return np.asarray(values, dtype=float)
+    except (TypeError, ValueError):
+        values = np.asarray(values, dtype=object)
+        bad = int(np.argmin(_is_number_vec(values).astype(bool)))
+        raise PlotDataError(f"Data item at index {bad} has a non-numeric {name}: {values[bad]!r}") from None
+
+
+def _read_arrow(data):
+    """Columns of an Arrow table, record batch or IPC stream buffer, or None if data isn't Arrow"""
+    if isinstance(data, (bytes, bytearray, memoryview)):
+        import pyarrow as pa
+
+        data = pa.ipc.open_stream(pa.py_buffer(data)).read_all()
+    module = type(data).__module__
+    if not module.startswith("pyarrow"):
+        return None
+    return [column.to_numpy(zero_copy_only=False) for column in data.columns]
+
+
+def _pick(mapping: dict, keys) -> np.ndarray:
+    for key in keys:
+        if key in mapping:
+            return mapping[key]
+    raise PlotDataError(f"Columnar data needs one of the keys {list(keys)}, got {list(mapping)}")
+
+
+def _pair_columns(data, numeric: bool = True):
+    """Split chart input into its two columns without touching rows one at a time.
+    With numeric=False list input keeps its original values, so labels aren't turned into floats"""
+    if isinstance(data, dict):
+        first, second = _pick(data, FIRST_COLUMN_KEYS), _pick(data, SECOND_COLUMN_KEYS)
+        if len(first) != len(second):
+            raise PlotDataError(f"Columns have different lengths: {len(first)} and {len(second)}")
+        return first, second
+
+    columns = _read_arrow(data)
+    if columns is not None:
+        if len(columns) < 2:
+            raise PlotDataError("Arrow data needs at least two columns")
+        return columns[0], columns[1]
+
+    if isinstance(data, np.ndarray) and data.ndim == 2 and data.shape[1] == 2:
+        return data[:, 0], data[:, 1]
+    if not isinstance(data, (list, tuple, np.ndarray)):
+        raise PlotDataError("Data must be a list of pairs or a mapping of columns")
+
+    # Numeric rows convert straight to a float matrix; anything else goes through an object array
+    matrix = None
+    if numeric:
+        try:
+            matrix = np.asarray(data, dtype=float)
+        except (TypeError, ValueError):
+            pass
+    if matrix is None or matrix.ndim != 2:
+        matrix = np.fromiter(data, dtype=object, count=len(data))
+        ok = _is_pair_vec(matrix).astype(bool)
+        if not ok.all():
+            raise PlotDataError(f"Data item at index {int(np.argmin(ok))} must be a list with exactly 2 elements")
+        matrix = np.array(matrix.tolist(), dtype=object)
+    if matrix.shape[1] != 2:
+        raise PlotDataError("Data item at index 0 must be a list with exactly 2 elements")
+    return matrix[:, 0], matrix[:, 1]
+
+
+def ingest_points(data) -> Tuple[np.ndarray, np.ndarray]:
+    """Numeric (x, y) arrays for line and scatter charts"""
+    first, second = _pair_columns(data)
+    return to_numeric(first, "x"), to_numeric(second, "y")
+
+
+def ingest_labeled(data) -> Tuple[np.ndarray, np.ndarray]:
+    """(label, value) arrays for bar and pie charts; labels become strings as str() would write them
+
+    >>> labels, _ = ingest_labeled([[2020, 5], [2021, 7]])
+    >>> labels.tolist()
+    ['2020', '2021']
+    >>> ingest_labeled({"label": [1, 2, 3], "value": [4, 5, 6]})[0].tolist()
+    ['1', '2', '3']
+    """
+    first, second = _pair_columns(data, numeric=False)
+    return np.asarray(first, dtype=object).astype(str), to_numeric(second, "value")
+
+
+def ingest_values(data) -> np.ndarray:
+    """Numeric array for histograms from a flat list, a {"values": [...]} mapping or one Arrow column"""
+    if isinstance(data, dict):
+        data = _pick(data, SECOND_COLUMN_KEYS + FIRST_COLUMN_KEYS)
+    else:
+        columns = _read_arrow(data)
+        if columns is not None:
+            data = columns[0]
+    values = to_numeric(data)
+    if values.ndim != 1:
+        raise PlotDataError("Data must be a flat list of numeric values")
+    return values
@@ -0,0 +1,91 @@
+import asyncio
+import uuid
+from contextvars import ContextVar
+from dataclasses import dataclass, field, fields
+from typing import Any, Callable, Dict, List, Mapping, Optional
+
+from autogen_core import CancellationToken
+from autogen_core.tools import FunctionTool
+
+
+@dataclass(frozen=True)
+class PlotArtifact:
+    """A chart a plotting tool wrote, as returned by _save_chart"""
+
+    call_id: str
+    tool: str
+    plot_path: str
+    profile: Optional[str] = None
+    format: Optional[str] = None
+    dpi: Optional[int] = None
+    bytes: Optional[int] = None
+    render_ms: Optional[float] = None
+    encode_ms: Optional[float] = None
+    cached: Optional[bool] = None
+    thumbnail_path: Optional[str] = None
+    details: Dict[str, Any] = field(default_factory=dict)
+
+    @classmethod
+    def from_result(cls, tool: str, result: dict, call_id: Optional[str] = None) -> "PlotArtifact":
+        known = {f.name for f in fields(cls)} - {"call_id", "tool", "details"}
+        return cls(
+            call_id=call_id or f"{tool}-{uuid.uuid4().hex[:12]}",
+            tool=tool,
+            details={key: value for key, value in result.items() if key not in known and key != "status"},
+            **{key: value for key, value in result.items() if key in known},
+        )
+
+    def render_stats(self) -> dict:
+        return {
+            key: getattr(self, key)
+            for key in ("profile", "format", "dpi", "bytes", "render_ms", "encode_ms", "cached")
+            if getattr(self, key) is not None
+        }
+
+
+class PlotResultChannel:
+    """Per-request side channel the plotting tools publish to, keyed by tool call id"""
+
+    def __init__(self):
+        self._artifacts: Dict[str, PlotArtifact] = {}
+        self._first: Optional[PlotArtifact] = None
+        self._ready = asyncio.Event()
+
+    def publish(self, artifact: PlotArtifact):
+        self._artifacts[artifact.call_id] = artifact
+        if self._first is None:
+            self._first = artifact
+            self._ready.set()
+
+    def get(self, call_id: str) -> Optional[PlotArtifact]:
+        return self._artifacts.get(call_id)
+
+    @property
+    def first(self) -> Optional[PlotArtifact]:
+        return self._first
+
+    async def wait(self) -> PlotArtifact:
+        """The first chart published, as soon as its render finishes"""
+        await self._ready.wait()
+        return self._first
+
+
+# Set by the request handler; PlotTool publishes into it
+current_plot_results: ContextVar[Optional[PlotResultChannel]] = ContextVar("current_plot_results", default=None)
+
+
+class PlotTool(FunctionTool):
+    """FunctionTool that also publishes successful chart results to the request's PlotResultChannel"""
+
+    async def run_json(self, args: Mapping[str, Any], cancellation_token: CancellationToken, call_id: Optional[str] = None) -> Any:
+        # autogen-core 0.6 does not hand tools their call id; newer releases pass it as call_id
+        result = await super().run_json(args, cancellation_token)
+        channel = current_plot_results.get()
+        if channel is not None and isinstance(result, dict) and "plot_path" in result:
+            channel.publish(PlotArtifact.from_result(self.name, result, call_id))
+        return result
+
+
+def plot_tools(*functions: Callable) -> List[PlotTool]:
+    """Wrap plotting functions the way AssistantAgent wraps plain callables"""
+    return [PlotTool(function, description=function.__doc__ or "") for function in functions]
@@ -0,0 +1,96 @@
+import numpy as np
+
+# Plotly figure JSON built from the same specs the matplotlib renderer draws, so the browser
+# can render the chart and the server skips rasterization. Only plain dicts are produced;
+# the plotly package is not needed on the server.
+
+# Above this many points, traces use WebGL
+WEBGL_POINTS = 1000
+
+
+def _values(array) -> list:
+    """JSON-ready list; NaN and inf become null, which Plotly draws as gaps"""
+    array = np.asarray(array)
+    if array.dtype.kind == "f":
+        missing = ~np.isfinite(array)
+        if missing.any():
+            array = array.astype(object)
+            array[missing] = None
+    return array.tolist()
+
+
+def _layout(spec: dict) -> dict:
+    layout = {"title": {"text": spec["title"]}, "margin": {"t": 60}}
+    if spec.get("xlabel"):
+        layout["xaxis"] = {"title": {"text": spec["xlabel"]}}
+    if spec.get("ylabel"):
+        layout["yaxis"] = {"title": {"text": spec["ylabel"]}}
+    return layout
+
+
+def _bar(spec):
+    return [{"type": "bar", "x": _values(spec["categories"]), "y": _values(spec["values"]), "marker": {"color": spec["color"]}}]
+
+
+def _line(spec):
+    small = len(spec["x"]) <= WEBGL_POINTS
+    return [{
+        "type": "scatter" if small else "scattergl",
+        "mode": "lines+markers" if small else "lines",
+        "x": _values(spec["x"]),
+        "y": _values(spec["y"]),
+        "line": {"color": spec["color"]},
+    }]
+
+
+def _histogram(spec):
+    # Binned on the server so the payload is one bar per bin, not every raw value
+    values = np.asarray(spec["values"], dtype=float)
+    counts, edges = np.histogram(values[np.isfinite(values)], bins=spec["bins"])
+    return [{
+        "type": "bar",
+        "x": _values((edges[:-1] + edges[1:]) / 2),
+        "y": _values(counts),
+        "width": _values(np.diff(edges)),
+        "marker": {"color": spec["color"], "line": {"color": "black", "width": 1}},
+        "opacity": 0.7,
+    }]
+
+
+def _scatter(spec):
+    density = spec.get("density")
+    if density is not None:
+        x_edges, y_edges = np.asarray(density["x_edges"]), np.asarray(density["y_edges"])
+        counts = np.array(density["counts"], dtype=float)
+        counts[counts == 0] = np.nan
+        return [{
+            "type": "heatmap",
+            "x": _values((x_edges[:-1] + x_edges[1:]) / 2),
+            "y": _values((y_edges[:-1] + y_edges[1:]) / 2),
+            "z": _values(counts),
+            "colorscale": [[0, "rgba(255,255,255,0)"], [1, spec["color"]]],
+            "colorbar": {"title": {"text": "Points"}},
+        }]
+    return [{
+        "type": "scatter" if len(spec["x"]) <= WEBGL_POINTS else "scattergl",
+        "mode": "markers",
+        "x": _values(spec["x"]),
+        "y": _values(spec["y"]),
+        "marker": {"color": spec["color"], "opacity": 0.7},
+    }]
+
+
+def _pie(spec):
+    trace = {"type": "pie", "labels": _values(spec["labels"]), "values": _values(spec["values"]),
+             "sort": False, "direction": "counterclockwise", "rotation": 90, "textinfo": "label+percent"}
+    if spec.get("colors"):
+        trace["marker"] = {"colors": list(spec["colors"])}
+    return [trace]
+
+
+_TRACES = {"bar": _bar, "line": _line, "histogram": _histogram, "scatter": _scatter, "pie": _pie}
+
+
+def build_plotly_spec(kind: str, spec: dict) -> dict:
+    """Plotly figure ({data, layout}) for a chart spec"""
+    return {"data": _TRACES[kind](spec), "layout": _layout(spec)}
@@ -1,224 +1,231 @@
-import matplotlib.pyplot as plt
+import asyncio
+import json
 import os
-from datetime import datetime
-from typing import List, Union, Optional
-# Add this at the top of your file, before any other imports
-import matplotlib
-matplotlib.use('Agg')  # Use the non-interactive Agg backend
+import time
+from typing import Dict, List, Union, Optional
 
+import numpy as np
 
-def create_bar_chart(
-    data: List[List[Union[str, int, float]]], 
+from config import get_plot_settings
+from tool.downsample import reduce_line, reduce_scatter
+from tool.plotly_spec import build_plotly_spec
+from tool.plot_data import PlotDataError, ingest_labeled, ingest_points, ingest_values
+from tool.render_cache import render_cache
+from tool.render_pool import render_pool
+from tool.render_profiles import current_render_profile, resolve_profile
+
+plot_settings = get_plot_settings()
+default_profile = resolve_profile()
+
+
+def _write_plotly_spec(kind: str, spec: dict, path: str) -> dict:
+    started = time.perf_counter()
+    figure = build_plotly_spec(kind, spec)
+    encode_started = time.perf_counter()
+    payload = json.dumps(figure, separators=(",", ":"), allow_nan=False)
+    with open(path, "w") as f:
+        f.write(payload)
+    done = time.perf_counter()
+    return {"render_ms": round((done - started) * 1000, 3), "encode_ms": round((done - encode_started) * 1000, 3)}
+
+
+async def _save_plotly_spec(kind: str, prefix: str, spec: dict, profile, **details) -> dict:
+    """Write the chart as Plotly JSON for the browser to draw; cached like rendered images"""
+    key = render_cache.key(kind, spec, format=profile.format)
+    filepath = os.path.join(render_cache.directory, f"{prefix}_{key}.json")
+    
+    stats = {}
+    async def write(tmp_paths):
+        stats.update(await asyncio.to_thread(_write_plotly_spec, kind, spec, tmp_paths[0]))
+    cached = await render_cache.get_or_render([filepath], write)
+    
+    return {
+        "status": "success",
+        "plot_path": filepath,
+        "absolute_path": os.path.abspath(filepath),
+        "cached": cached,
+        "profile": profile.name,
+        "format": profile.format,
+        "bytes": os.path.getsize(filepath),
+        "render_ms": stats.get("render_ms"),
+        "encode_ms": stats.get("encode_ms"),
+        **details
+    }
+
+
+async def _save_chart(kind: str, prefix: str, spec: dict, **details) -> dict:
+    """Render in the worker pool with the request's profile, or reuse the file from an identical earlier call"""
+    profile = current_render_profile.get() or default_profile
+    if profile.format == "plotly":
+        return await _save_plotly_spec(kind, prefix, spec, profile, **details)
+    key = render_cache.key(kind, spec, format=profile.format, dpi=profile.dpi, tight=profile.tight)
+    filepath = os.path.join(render_cache.directory, f"{prefix}_{key}.{profile.format}")
+    paths = [filepath]
+    if profile.thumbnail:
+        paths.append(os.path.join(render_cache.directory, f"{prefix}_{key}_thumb.png"))
+    
+    stats = {}
+    async def render(tmp_paths):
+        stats.update(await render_pool.render(kind, spec, profile.outputs(*tmp_paths)))
+    cached = await render_cache.get_or_render(paths, render)
+    
+    result = {
+        "status": "success",
+        "plot_path": filepath,
+        "absolute_path": os.path.abspath(filepath),
+        "cached": cached,
+        "profile": profile.name,
+        "format": profile.format,
+        "dpi": profile.dpi,
+        "bytes": os.path.getsize(filepath),
+        "render_ms": stats.get("render_ms"),
+        "encode_ms": stats["outputs"][0]["encode_ms"] if stats else None,
+        **details
+    }
+    if profile.thumbnail:
+        result["thumbnail_path"] = paths[1]
+    return result
+
+
+async def create_bar_chart(
+    data: Union[List[List[Union[str, int, float]]], Dict[str, List[Union[str, int, float]]]], 
     title: str = "Bar Chart", 
     color: str = 'skyblue', 
     xlabel: str = "Category", 
     ylabel: str = "Value"
 ) -> Union[dict]:
-    """Create a bar chart from list data"""
+    """Create a bar chart from [category, value] rows or {category: [...], value: [...]} columns"""
     try:
-        if not data:
+        if data is None or len(data) == 0:
             return {"error": "Data parameter is required and cannot be empty. Expected format: [['category1', value1], ['category2', value2], ...]"}
         
-        if not isinstance(data, list):
-            return {"error": "Data must be a list of lists. Expected format: [['category1', value1], ['category2', value2], ...]"}
-        
-        for i, item in enumerate(data):
-            if not isinstance(item, list) or len(item) != 2:
-                return {"error": f"Data item at index {i} must be a list with exactly 2 elements [category, value]"}
-        
-        categories = [str(item[0]) for item in data]
-        values = [float(item[1]) for item in data]
-        
-        plt.figure(figsize=(10, 6))
-        plt.bar(categories, values, color=color)
-        plt.title(title, fontsize=14, fontweight='bold')
-        plt.xlabel(xlabel, fontsize=12)
-        plt.ylabel(ylabel, fontsize=12)
-        plt.grid(True, alpha=0.3, axis='y')
-        plt.tight_layout()
-        
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filepath = f"plots/bar_chart_{timestamp}.png"
-        os.makedirs("plots", exist_ok=True)
-        plt.savefig(filepath, dpi=300, bbox_inches='tight')
-        plt.close()
-        
-        return {
-            "status": "success",
-            "plot_path": filepath,
-            "absolute_path": os.path.abspath(filepath)
-        }
+        try:
+            categories, values = ingest_labeled(data)
+        except PlotDataError as e:
+            return {"error": f"{e}. Expected format: [['category1', value1], ['category2', value2], ...] or {{'category': [...], 'value': [...]}}"}
+        
+        return await _save_chart("bar", "bar_chart", {
+            "categories": categories,
+            "values": values,
+            "color": color,
+            "title": title,
+            "xlabel": xlabel,
+            "ylabel": ylabel
+        })
     except Exception as e:
-        plt.close()
         return {"error": f"Error creating bar chart: {str(e)}"}
 
-def create_line_chart(
-    data: List[List[Union[int, float]]], 
+async def create_line_chart(
+    data: Union[List[List[Union[int, float]]], Dict[str, List[Union[int, float]]]], 
     title: str = "Line Chart", 
     color: str = 'blue', 
     xlabel: str = "X", 
     ylabel: str = "Y"
 ) -> Union[dict]:
-    """Create a line chart from list data"""
+    """Create a line chart from [x, y] rows or {x: [...], y: [...]} columns"""
     try:
-        if not data:
+        if data is None or len(data) == 0:
             return {"error": "Data parameter is required and cannot be empty. Expected format: [[x1, y1], [x2, y2], ...]"}
         
-        if not isinstance(data, list):
-            return {"error": "Data must be a list of lists. Expected format: [[x1, y1], [x2, y2], ...]"}
-        
-        for i, item in enumerate(data):
-            if not isinstance(item, list) or len(item) != 2:
-                return {"error": f"Data item at index {i} must be a list with exactly 2 numeric elements [x, y]"}
-        
-        x_values = [float(item[0]) for item in data]
-        y_values = [float(item[1]) for item in data]
-        
-        plt.figure(figsize=(10, 6))
-        plt.plot(x_values, y_values, marker='o', color=color, linewidth=2)
-        plt.title(title, fontsize=14, fontweight='bold')
-        plt.xlabel(xlabel, fontsize=12)
-        plt.ylabel(ylabel, fontsize=12)
-        plt.grid(True, alpha=0.3)
-        plt.tight_layout()
-        
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filepath = f"plots/line_chart_{timestamp}.png"
-        os.makedirs("plots", exist_ok=True)
-        plt.savefig(filepath, dpi=300, bbox_inches='tight')
-        plt.close()
-        
-        return {
-            "status": "success",
-            "plot_path": filepath,
-            "absolute_path": os.path.abspath(filepath)
-        }
+        try:
+            x_points, y_points = ingest_points(data)
+        except PlotDataError as e:
+            return {"error": f"{e}. Expected format: [[x1, y1], [x2, y2], ...] or {{'x': [...], 'y': [...]}}"}
+        
+        x_values, y_values, reduction = reduce_line(x_points, y_points, plot_settings["max_points"])
+        
+        return await _save_chart("line", "line_chart", {
+            "x": x_values,
+            "y": y_values,
+            "color": color,
+            "title": title,
+            "xlabel": xlabel,
+            "ylabel": ylabel
+        }, points=len(x_points), points_plotted=len(x_values), reduction=reduction)
     except Exception as e:
-        plt.close()
         return {"error": f"Error creating line chart: {str(e)}"}
 
-def create_histogram(
-    data: List[Union[int, float]], 
+async def create_histogram(
+    data: Union[List[Union[int, float]], Dict[str, List[Union[int, float]]]], 
     bins: int = 20, 
     title: str = "Histogram", 
     color: str = 'steelblue', 
     xlabel: str = "Values"
 ) -> Union[dict]:
-    """Create a histogram from list data"""
+    """Create a histogram from a list of values or {values: [...]}"""
     try:
-        if not data:
+        if data is None or len(data) == 0:
             return {"error": "Data parameter is required and cannot be empty. Expected format: [value1, value2, value3, ...]"}
         
-        if not isinstance(data, list):
-            return {"error": "Data must be a list of numeric values. Expected format: [value1, value2, value3, ...]"}
-        
-        numeric_data = [float(x) for x in data]
-        
-        plt.figure(figsize=(10, 6))
-        plt.hist(numeric_data, bins=bins, alpha=0.7, edgecolor='black', color=color)
-        plt.title(title, fontsize=14, fontweight='bold')
-        plt.xlabel(xlabel, fontsize=12)
-        plt.ylabel("Frequency", fontsize=12)
-        plt.grid(True, alpha=0.3, axis='y')
-        plt.tight_layout()
-        
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filepath = f"plots/histogram_{timestamp}.png"
-        os.makedirs("plots", exist_ok=True)
-        plt.savefig(filepath, dpi=300, bbox_inches='tight')
-        plt.close()
-        
-        return {
-            "status": "success",
-            "plot_path": filepath,
-            "absolute_path": os.path.abspath(filepath)
-        }
+        try:
+            numeric_data = ingest_values(data)
+        except PlotDataError as e:
+            return {"error": f"{e}. Expected format: [value1, value2, value3, ...]"}
+        
+        return await _save_chart("histogram", "histogram", {
+            "values": numeric_data,
+            "bins": bins,
+            "color": color,
+            "title": title,
+            "xlabel": xlabel,
+            "ylabel": "Frequency"
+        })
     except Exception as e:
-        plt.close()
         return {"error": f"Error creating histogram: {str(e)}"}
 
-def create_scatter_plot(
-    data: List[List[Union[int, float]]], 
+async def create_scatter_plot(
+    data: Union[List[List[Union[int, float]]], Dict[str, List[Union[int, float]]]], 
     title: str = "Scatter Plot", 
     color: str = 'red', 
     xlabel: str = "X", 
     ylabel: str = "Y"
 ) -> Union[dict]:
-    """Create a scatter plot from list data"""
+    """Create a scatter plot from [x, y] rows or {x: [...], y: [...]} columns"""
     try:
-        if not data:
+        if data is None or len(data) == 0:
             return {"error": "Data parameter is required and cannot be empty. Expected format: [[x1, y1], [x2, y2], ...]"}
         
-        if not isinstance(data, list):
-            return {"error": "Data must be a list of lists. Expected format: [[x1, y1], [x2, y2], ...]"}
-        
-        for i, item in enumerate(data):
-            if not isinstance(item, list) or len(item) != 2:
-                return {"error": f"Data item at index {i} must be a list with exactly 2 numeric elements [x, y]"}
-        
-        x_values = [float(item[0]) for item in data]
-        y_values = [float(item[1]) for item in data]
-        
-        plt.figure(figsize=(10, 6))
-        plt.scatter(x_values, y_values, alpha=0.7, color=color, s=50)
-        plt.title(title, fontsize=14, fontweight='bold')
-        plt.xlabel(xlabel, fontsize=12)
-        plt.ylabel(ylabel, fontsize=12)
-        plt.grid(True, alpha=0.3)
-        plt.tight_layout()
-        
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filepath = f"plots/scatter_plot_{timestamp}.png"
-        os.makedirs("plots", exist_ok=True)
-        plt.savefig(filepath, dpi=300, bbox_inches='tight')
-        plt.close()
-        
-        return {
-            "status": "success",
-            "plot_path": filepath,
-            "absolute_path": os.path.abspath(filepath)
-        }
+        try:
+            x_points, y_points = ingest_points(data)
+        except PlotDataError as e:
+            return {"error": f"{e}. Expected format: [[x1, y1], [x2, y2], ...] or {{'x': [...], 'y': [...]}}"}
+        
+        series, reduction = reduce_scatter(
+            x_points, y_points, plot_settings["max_points"], plot_settings["scatter_reduction"]
+        )
+        # A density plot draws its non-empty bins, not the points
+        plotted = int(np.count_nonzero(series["density"]["counts"])) if "density" in series else len(series["x"])
+        
+        return await _save_chart("scatter", "scatter_plot", {
+            **series,
+            "color": color,
+            "title": title,
+            "xlabel": xlabel,
+            "ylabel": ylabel
+        }, points=len(x_points), points_plotted=plotted, reduction=reduction)
     except Exception as e:
-        plt.close()
         return {"error": f"Error creating scatter plot: {str(e)}"}
 
-def create_pie_chart(
-    data: List[List[Union[str, int, float]]], 
+async def create_pie_chart(
+    data: Union[List[List[Union[str, int, float]]], Dict[str, List[Union[str, int, float]]]], 
     title: str = "Pie Chart", 
     colors: Optional[List[str]] = None
 ) -> Union[dict]:
-    """Create a pie chart from list data"""
+    """Create a pie chart from [label, value] rows or {label: [...], value: [...]} columns"""
     try:
-        if not data:
+        if data is None or len(data) == 0:
             return {"error": "Data parameter is required and cannot be empty. Expected format: [['label1', value1], ['label2', value2], ...]"}
         
-        if not isinstance(data, list):
-            return {"error": "Data must be a list of lists. Expected format: [['label1', value1], ['label2', value2], ...]"}
-        
-        for i, item in enumerate(data):
-            if not isinstance(item, list) or len(item) != 2:
-                return {"error": f"Data item at index {i} must be a list with exactly 2 elements [label, value]"}
-        
-        labels = [str(item[0]) for item in data]
-        values = [float(item[1]) for item in data]
-        
-        plt.figure(figsize=(8, 8))
-        plt.pie(values, labels=labels, autopct='%1.1f%%', startangle=90, colors=colors)
-        plt.title(title, fontsize=14, fontweight='bold')
-        plt.axis('equal')
-        plt.tight_layout()
-        
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filepath = f"plots/pie_chart_{timestamp}.png"
-        os.makedirs("plots", exist_ok=True)
-        plt.savefig(filepath, dpi=300, bbox_inches='tight')
-        plt.close()
-        
-        return {
-            "status": "success",
-            "plot_path": filepath,
-            "absolute_path": os.path.abspath(filepath)
-        }
+        try:
+            labels, values = ingest_labeled(data)
+        except PlotDataError as e:
+            return {"error": f"{e}. Expected format: [['label1', value1], ['label2', value2], ...] or {{'label': [...], 'value': [...]}}"}
+        
+        return await _save_chart("pie", "pie_chart", {
+            "labels": labels,
+            "values": values,
+            "colors": colors,
+            "title": title
+        })
     except Exception as e:
-        plt.close()
         return {"error": f"Error creating pie chart: {str(e)}"}
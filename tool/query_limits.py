@@ -0,0 +1,34 @@
+import threading
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Optional
+
+
+@dataclass
+class QueryLimits:
+    """Wall-clock, row and cancellation limits applied to agent-issued SQL"""
+
+    timeout: Optional[float] = 15
+    max_rows: int = 10000
+    cancel_event: threading.Event = field(default_factory=threading.Event)
+
+    def cancel(self):
+        """Abort any statement currently running under these limits"""
+        self.cancel_event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self.cancel_event.is_set()
+
+    def execution_options(self) -> dict:
+        """SQLAlchemy execution options read by the engine's progress handler"""
+        return {"statement_timeout": self.timeout, "cancel_event": self.cancel_event}
+
+    def bind(self, cancellation_token):
+        """Cancel running SQL when an autogen CancellationToken fires"""
+        cancellation_token.add_callback(self.cancel)
+        return self
+
+
+# Set by the request handler; the agent runtime's tasks and tool threads inherit it
+current_query_limits: ContextVar[Optional[QueryLimits]] = ContextVar("current_query_limits", default=None)
@@ -0,0 +1,184 @@
+import re
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from sqlalchemy import text
+
+from tool.sql_cache import canonicalize_sql, database_version
+
+_TABLE_REF = re.compile(r'(?:\bfrom|\bjoin|,)\s+"?(\w+)"?(?:\s+(?:as\s+)?(?!on\b|where\b|join\b|inner\b|left\b|cross\b|group\b|order\b|limit\b)(\w+))?', re.IGNORECASE)
+_PLAN_STEP = re.compile(r"^(SCAN|SEARCH) (\w+)(.*)$")
+_TRAILING_LIMIT = re.compile(r"\blimit \d+(?:(?: offset|,)\d+| offset \d+)?$")
+_AGGREGATE = re.compile(r"\bgroup by\b|\b(?:count|sum|avg|min|max|total|group_concat)\(")
+
+
+@dataclass
+class PlanVerdict:
+    """Outcome of the cost guard: proceed, rewrite (with a new query) or reject"""
+
+    action: str
+    query: str
+    message: str = ""
+    estimated_rows: Optional[float] = None
+    steps: List[str] = field(default_factory=list)
+
+
+class QueryCostGuard:
+    """Inspects EXPLAIN QUERY PLAN output before agent SQL runs against the database"""
+
+    def __init__(self, large_table_rows: int = 100000, max_cost: float = 50_000_000, rewrite_limit: int = 10000):
+        self.large_table_rows = large_table_rows
+        self.max_cost = max_cost
+        self.rewrite_limit = rewrite_limit
+        self._row_counts = {}
+        self._lock = threading.Lock()
+
+    def _table_stats(self, connection, version) -> Dict[str, dict]:
+        """Row estimates and foreign keys per table, refreshed when the database file changes"""
+        with self._lock:
+            cached = self._row_counts.get(version)
+        if cached is not None:
+            return cached
+
+        stats = {}
+        tables = [row[0] for row in connection.execute(text(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'"
+        ))]
+        analyzed = {}
+        has_stat1 = connection.execute(text(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'"
+        )).first() is not None
+        if has_stat1:
+            for table, index, stat in connection.execute(text("SELECT tbl, idx, stat FROM sqlite_stat1")):
+                parts = (stat or "").split()
+                if parts:
+                    analyzed.setdefault(table, {"rows": int(parts[0]), "fanout": {}})
+                    if index and len(parts) > 1:
+                        analyzed[table]["fanout"][index] = int(parts[1])
+
+        for table in tables:
+            if table in analyzed:
+                entry = dict(analyzed[table])
+            else:
+                # MAX(rowid) is a cheap upper bound when ANALYZE has never been run
+                try:
+                    rows = connection.execute(text(f'SELECT MAX(rowid) FROM "{table}"')).scalar() or 0
+                except Exception:
+                    rows = None
+                entry = {"rows": rows, "fanout": {}}
+            entry["foreign_keys"] = [
+                (row[3], row[2], row[4])
+                for row in connection.execute(text(f'PRAGMA foreign_key_list("{table}")'))
+            ]
+            stats[table.lower()] = entry
+
+        with self._lock:
+            self._row_counts = {version: stats}
+        return stats
+
+    @staticmethod
+    def _aliases(query: str) -> Dict[str, str]:
+        aliases = {}
+        for table, alias in _TABLE_REF.findall(query):
+            aliases[table.lower()] = table.lower()
+            if alias:
+                aliases[alias.lower()] = table.lower()
+        return aliases
+
+    def check(self, engine, query: str) -> PlanVerdict:
+        """Decide whether a SELECT may run as-is, needs a LIMIT, or should go back to the agent"""
+        if engine.dialect.name != "sqlite":
+            return PlanVerdict("proceed", query)
+
+        version = database_version(engine.url.database)
+        with engine.connect() as connection:
+            stats = self._table_stats(connection, version)
+            plan_rows = [tuple(row) for row in connection.execute(text(f"EXPLAIN QUERY PLAN {query}"))]
+        plan = [row[3] for row in plan_rows]
+
+        aliases = self._aliases(query)
+        scanned = []
+        warnings = []
+
+        def loop_factor(detail, outer_loops) -> float:
+            kind, name, rest = _PLAN_STEP.match(detail).groups()
+            table = aliases.get(name.lower(), name.lower())
+            table_stats = stats.get(table, {})
+            rows = table_stats.get("rows")
+            if kind == "SCAN" and "COVERING INDEX" not in rest:
+                factor = rows or 1
+                scanned.append((table, rows))
+                if outer_loops:
+                    warnings.append(f"{table} is scanned in full for every row of the outer loop (no index used for the join)")
+            elif kind == "SCAN":
+                factor = rows or 1
+            elif "PRIMARY KEY" in rest:
+                factor = 1
+            else:
+                index = re.search(r"INDEX (\w+)", rest)
+                factor = table_stats.get("fanout", {}).get(index.group(1) if index else "", 10)
+            if "AUTOMATIC" in rest:
+                warnings.append(f"SQLite has to build a temporary index on {table}; the join column is not indexed")
+            return max(factor, 1)
+
+        def block_cost(node_ids) -> float:
+            """SCAN/SEARCH siblings are nested loops and multiply; subqueries, compound branches
+            and materialized views run once and add, except correlated ones, which run per outer row"""
+            loops = 1.0
+            outer_loops = 0
+            subplans = 0.0
+            for node_id in node_ids:
+                detail = details[node_id]
+                if _PLAN_STEP.match(detail):
+                    loops *= loop_factor(detail, outer_loops)
+                    outer_loops += 1
+                elif children.get(node_id):
+                    repeats = loops if detail.startswith("CORRELATED") else 1.0
+                    subplans += repeats * block_cost(children[node_id])
+            return (loops if outer_loops else 0.0) + subplans
+
+        # EXPLAIN QUERY PLAN rows are (id, parent, notused, detail); parent 0 is the top level
+        details = {}
+        children = {}
+        for node_id, parent, _, detail in plan_rows:
+            details[node_id] = detail
+            children.setdefault(parent, []).append(node_id)
+        cost = max(block_cost(children.get(0, [])), 1.0)
+
+        steps = list(plan)
+        large_scans = [(table, rows) for table, rows in scanned if rows and rows >= self.large_table_rows]
+
+        if cost > self.max_cost:
+            message = self._reject_message(cost, scanned, warnings, stats, set(aliases.values()))
+            return PlanVerdict("reject", query, message, cost, steps)
+
+        canonical = canonicalize_sql(query)
+        # Aggregates already return few rows, so a LIMIT would only hide the scan, not shorten it
+        needs_limit = not _TRAILING_LIMIT.search(canonical) and not _AGGREGATE.search(canonical)
+        if large_scans and needs_limit:
+            rewritten = f"SELECT * FROM ({query.strip().rstrip(';')}) LIMIT {self.rewrite_limit}"
+            tables = ", ".join(f"{table} (~{rows:,} rows)" for table, rows in large_scans)
+            message = f"Note: LIMIT {self.rewrite_limit} was added because the query scans {tables} in full."
+            return PlanVerdict("rewrite", rewritten, message, cost, steps)
+
+        return PlanVerdict("proceed", query, "; ".join(warnings), cost, steps)
+
+    def _reject_message(self, cost, scanned, warnings, stats, tables) -> str:
+        scans = " x ".join(f"{table} (~{rows or '?'} rows)" for table, rows in scanned) or "the plan"
+        hints = []
+        for table, _ in scanned:
+            for from_column, target, to_column in stats.get(table, {}).get("foreign_keys", []):
+                if target.lower() in tables:
+                    hints.append(f"{table}.{from_column} = {target}.{to_column}")
+        message = (
+            f"Error: query rejected before execution. Its plan would visit about {cost:,.0f} rows "
+            f"(full scans of {scans})."
+        )
+        if warnings:
+            message += " " + "; ".join(dict.fromkeys(warnings)) + "."
+        if hints:
+            message += " Join the tables on their keys, e.g. " + ", ".join(dict.fromkeys(hints)) + ","
+        else:
+            message += " Join the tables on their keys,"
+        return message + " filter with WHERE before joining, or aggregate, then try again."
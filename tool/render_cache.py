@@ -0,0 +1,163 @@
+import asyncio
+import hashlib
+import json
+import os
+import re
+import threading
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+from typing import List
+
+import numpy as np
+
+from config import get_render_cache_settings
+
+_CACHED_FILE = re.compile(r"^\w+_[0-9a-f]{24}(?:_thumb)?\.\w+$")
+
+
+def _encode(value):
+    """JSON stand-in for values json can't encode; arrays are hashed by content, not str()"""
+    if isinstance(value, np.ndarray):
+        if value.dtype == object:
+            return value.tolist()
+        digest = hashlib.sha256(np.ascontiguousarray(value).tobytes()).hexdigest()
+        return {"dtype": str(value.dtype), "shape": value.shape, "sha256": digest}
+    if isinstance(value, np.generic):
+        return value.item()
+    return str(value)
+
+
+class RenderCache:
+    """Content-addressed chart files: identical arguments map to one file, evicted LRU by total size"""
+
+    def __init__(self, directory="plots", max_bytes: int = 512 * 1024 * 1024):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self._files = OrderedDict()
+        self._bytes = 0
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._loaded = False
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def key(kind: str, spec: dict, **options) -> str:
+        """Hash of the chart type, its data and render options"""
+        payload = json.dumps([kind, spec, options], sort_keys=True, separators=(",", ":"), default=_encode)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:24]
+
+    def _load_locked(self):
+        """Index files left by earlier runs, oldest first, so they count against the budget"""
+        if self._loaded:
+            return
+        self._loaded = True
+        if not self.directory.exists():
+            return
+        entries = []
+        for path in self.directory.iterdir():
+            if _CACHED_FILE.match(path.name):
+                stat = path.stat()
+                entries.append((stat.st_mtime, str(path), stat.st_size))
+        for _, path, size in sorted(entries):
+            self._files[path] = size
+            self._bytes += size
+        self._evict_locked()
+
+    def _evict_locked(self):
+        while self._bytes > self.max_bytes and len(self._files) > 1:
+            path, size = self._files.popitem(last=False)
+            self._bytes -= size
+            self.evictions += 1
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def _present_locked(self, path: str) -> bool:
+        return path in self._files and os.path.exists(path)
+
+    def _add_locked(self, path: str):
+        size = os.path.getsize(path)
+        self._bytes += size - self._files.pop(path, 0)
+        self._files[path] = size
+        self._evict_locked()
+
+    async def get_or_render(self, paths: List[str], render) -> bool:
+        """Return True when every path is already cached; otherwise await render(tmp_paths) and
+        publish the files. Concurrent callers for the same files share one render."""
+        path = paths[0]
+        with self._lock:
+            self._load_locked()
+            if all(self._present_locked(p) for p in paths):
+                for p in paths:
+                    self._files.move_to_end(p)
+                    os.utime(p)
+                self.hits += 1
+                return True
+            pending = self._pending.get(path)
+            if pending is None:
+                self.misses += 1
+                pending = asyncio.get_running_loop().create_future()
+                self._pending[path] = pending
+                owner = True
+            else:
+                self.hits += 1
+                owner = False
+
+        if not owner:
+            try:
+                await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                # Only retry when the render we waited on was cancelled, not this caller
+                if not pending.cancelled():
+                    raise
+                return await self.get_or_render(paths, render)
+            return True
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        # Render under temporary names so readers never see a half-written file
+        tmp_paths = [str(self.directory / f".{uuid.uuid4().hex}{Path(p).suffix}") for p in paths]
+        try:
+            await render(tmp_paths)
+            for tmp_path, p in zip(tmp_paths, paths):
+                os.replace(tmp_path, p)
+            with self._lock:
+                for p in paths:
+                    self._add_locked(p)
+            pending.set_result(path)
+        except BaseException as e:
+            for tmp_path in tmp_paths:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+            if isinstance(e, asyncio.CancelledError):
+                pending.cancel()
+            else:
+                pending.set_exception(e)
+                # Waiters see the error; mark it retrieved so an unshared failure isn't logged as lost
+                pending.exception()
+            raise
+        finally:
+            with self._lock:
+                self._pending.pop(path, None)
+        return False
+
+    def metrics(self) -> dict:
+        with self._lock:
+            self._load_locked()
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._files),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+            }
+
+
+_settings = get_render_cache_settings()
+render_cache = RenderCache(_settings["directory"], int(_settings["max_mb"] * 1024 * 1024))
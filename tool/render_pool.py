@@ -0,0 +1,132 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import List
+
+from config import get_render_pool_settings
+from tool.chart_renderer import build_figure, render_chart
+
+logger = logging.getLogger(__name__)
+
+
+def _warm_worker():
+    """Pay matplotlib's import and font-cache cost once per worker instead of on the first chart"""
+    figure = build_figure("bar", {"categories": ["a"], "values": [1], "color": "skyblue", "title": "warm-up"})
+    figure.canvas.draw()
+
+
+class RenderPool:
+    """Warm worker processes that render charts so CPU-bound encodes stay off the event loop"""
+
+    def __init__(self, workers: int = 2):
+        self.workers = workers
+        self._executor = None
+        self._lock = threading.Lock()
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.in_flight = 0
+        self.render_total = 0.0
+        self.render_max = 0.0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.by_format = {}
+
+    def start(self):
+        """Launch and warm the workers; safe to call more than once"""
+        with self._lock:
+            if self._executor is None and self.workers > 0:
+                # spawn rather than fork: the server process already runs threads (uvicorn, DB pool)
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_warm_worker,
+                )
+                for _ in range(self.workers):
+                    self._executor.submit(os.getpid)
+                logger.info(f"Render pool started with {self.workers} workers")
+            return self._executor
+
+    async def render(self, kind: str, spec: dict, outputs: List[dict]) -> dict:
+        """Render in a worker; returns render_chart's timing and size stats"""
+        queued = time.perf_counter()
+        with self._lock:
+            self.submitted += 1
+            self.in_flight += 1
+        try:
+            executor = self.start()
+            if executor is None:
+                stats = await asyncio.to_thread(render_chart, kind, spec, outputs)
+            else:
+                stats = await asyncio.get_running_loop().run_in_executor(
+                    executor, render_chart, kind, spec, outputs
+                )
+        except BrokenProcessPool:
+            # A worker died (e.g. OOM); start a fresh pool on the next render
+            with self._lock:
+                self.failed += 1
+                if self._executor is executor:
+                    self._executor = None
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
+        except Exception:
+            with self._lock:
+                self.failed += 1
+            raise
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+        render_seconds = stats["render_ms"] / 1000
+        waited = time.perf_counter() - queued - render_seconds
+        with self._lock:
+            self.completed += 1
+            self.render_total += render_seconds
+            self.render_max = max(self.render_max, render_seconds)
+            self.wait_total += waited
+            self.wait_max = max(self.wait_max, waited)
+            for output in stats["outputs"]:
+                totals = self.by_format.setdefault(output["format"], {"renders": 0, "bytes": 0, "encode_ms": 0.0})
+                totals["renders"] += 1
+                totals["bytes"] += output["bytes"]
+                totals["encode_ms"] += output["encode_ms"]
+        return stats
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def metrics(self) -> dict:
+        with self._lock:
+            completed = self.completed or 1
+            return {
+                "workers": self.workers,
+                "running": self._executor is not None,
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "failed": self.failed,
+                "in_flight": self.in_flight,
+                "queue_depth": max(0, self.in_flight - self.workers),
+                "avg_render_ms": round(self.render_total / completed * 1000, 3),
+                "max_render_ms": round(self.render_max * 1000, 3),
+                "avg_wait_ms": round(self.wait_total / completed * 1000, 3),
+                "max_wait_ms": round(self.wait_max * 1000, 3),
+                "by_format": {
+                    fmt: {
+                        "renders": totals["renders"],
+                        "avg_bytes": totals["bytes"] // totals["renders"],
+                        "avg_encode_ms": round(totals["encode_ms"] / totals["renders"], 3),
+                    }
+                    for fmt, totals in self.by_format.items()
+                },
+            }
+
+
+render_pool = RenderPool(**get_render_pool_settings())
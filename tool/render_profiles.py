@@ -0,0 +1,56 @@
+from contextvars import ContextVar
+from dataclasses import dataclass, replace
+from typing import List, Optional, Tuple
+
+from config import get_plot_settings
+
+THUMBNAIL_DPI = 24
+
+
+@dataclass(frozen=True)
+class RenderProfile:
+    """Output format, resolution and trimming for a chart render"""
+
+    name: str
+    format: str
+    dpi: int
+    tight: bool
+    formats: Tuple[str, ...]
+    thumbnail: bool = False
+
+    def outputs(self, path: str, thumbnail_path: Optional[str] = None) -> List[dict]:
+        """Files to write from one drawn figure: the chart and, optionally, a small PNG thumbnail"""
+        outputs = [{"path": path, "format": self.format, "dpi": self.dpi, "tight": self.tight}]
+        if thumbnail_path:
+            outputs.append({"path": thumbnail_path, "format": "png", "dpi": THUMBNAIL_DPI, "tight": False})
+        return outputs
+
+
+# bbox_inches='tight' costs an extra layout pass, so the preview profile skips it
+RENDER_PROFILES = {
+    "preview": RenderProfile("preview", "webp", 96, tight=False, formats=("webp", "png")),
+    "report": RenderProfile("report", "png", 300, tight=True, formats=("png", "webp")),
+    "vector": RenderProfile("vector", "svg", 72, tight=True, formats=("svg", "pdf")),
+    # Plotly figure JSON drawn by the browser; nothing is rasterized on the server
+    "interactive": RenderProfile("interactive", "plotly", 0, tight=False, formats=("plotly",)),
+}
+
+
+def resolve_profile(name: Optional[str] = None, format: Optional[str] = None, thumbnail: Optional[bool] = None) -> RenderProfile:
+    """Profile by name with an optional format override; raises ValueError for unknown choices"""
+    settings = get_plot_settings()
+    name = name or settings["profile"]
+    if name not in RENDER_PROFILES:
+        raise ValueError(f"Unknown render profile '{name}', expected one of {list(RENDER_PROFILES)}")
+    profile = RENDER_PROFILES[name]
+    if format:
+        format = format.lower()
+        if format not in profile.formats:
+            raise ValueError(f"Format '{format}' is not available for the {name} profile, expected one of {list(profile.formats)}")
+        profile = replace(profile, format=format)
+    thumbnail = settings["thumbnail"] if thumbnail is None else thumbnail
+    return replace(profile, thumbnail=thumbnail and profile.format != "plotly")
+
+
+# Set by the request handler; plotting tools called by the agent render with it
+current_render_profile: ContextVar[Optional[RenderProfile]] = ContextVar("current_render_profile", default=None)
@@ -0,0 +1,90 @@
+import asyncio
+import logging
+import re
+import shutil
+import time
+import uuid
+from pathlib import Path, PurePosixPath
+from typing import List, Optional, Tuple
+
+from config import get_code_executor_settings
+from tool.docker_executer import work_dir
+
+logger = logging.getLogger(__name__)
+
+_RUN_ID = re.compile(r"^[0-9a-f]{32}$")
+
+
+class RunWorkspaces:
+    """One artifact directory per data-analysis run, so concurrent runs never overwrite each other's outputs"""
+
+    def __init__(self, root: Path, ttl: float = 3600):
+        self.root = Path(root)
+        self.ttl = ttl
+        self._stats = {"created": 0, "reaped": 0}
+
+    def create(self) -> Tuple[str, Path]:
+        run_id = uuid.uuid4().hex
+        directory = self.root / run_id
+        directory.mkdir(parents=True)
+        self._stats["created"] += 1
+        return run_id, directory
+
+    def path(self, run_id: str, filename: Optional[str] = None) -> Optional[Path]:
+        """Directory of a run, or one of its files by relative path; None for unknown runs and paths that would leave the directory"""
+        if not _RUN_ID.match(run_id or ""):
+            return None
+        directory = self.root / run_id
+        if filename is None:
+            return directory if directory.is_dir() else None
+        relative = PurePosixPath(filename)
+        if relative.is_absolute() or not relative.parts or ".." in relative.parts:
+            return None
+        path = directory.joinpath(*relative.parts)
+        # Symlinks written by analysis code must not reach outside the run either
+        if not path.resolve().is_relative_to(directory.resolve()):
+            return None
+        return path if path.is_file() else None
+
+    def files(self, run_id: str) -> List[str]:
+        """Relative paths of every file in a run, including those in subdirectories"""
+        directory = self.path(run_id)
+        if directory is None:
+            return []
+        return sorted(entry.relative_to(directory).as_posix() for entry in directory.rglob("*") if entry.is_file() and not entry.is_symlink())
+
+    def reap(self) -> int:
+        """Delete run directories not touched for longer than the TTL"""
+        if not self.root.is_dir():
+            return 0
+        cutoff = time.time() - self.ttl
+        reaped = 0
+        for directory in self.root.iterdir():
+            try:
+                if directory.is_dir() and directory.stat().st_mtime < cutoff:
+                    shutil.rmtree(directory)
+                    reaped += 1
+            except OSError as e:
+                logger.warning(f"Could not remove run workspace {directory.name}: {e}")
+        self._stats["reaped"] += reaped
+        return reaped
+
+    async def run_reaper(self, interval: float = 300):
+        """Background loop that deletes expired run workspaces"""
+        while True:
+            try:
+                await asyncio.to_thread(self.reap)
+            except Exception as e:
+                logger.error(f"Run workspace reaper failed: {e}")
+            await asyncio.sleep(interval)
+
+    def metrics(self) -> dict:
+        return {
+            "runs": sum(1 for entry in self.root.iterdir() if entry.is_dir()) if self.root.is_dir() else 0,
+            "ttl": self.ttl,
+            **self._stats,
+        }
+
+
+settings = get_code_executor_settings()
+run_workspaces = RunWorkspaces(work_dir / "runs", ttl=settings["run_ttl"])
@@ -0,0 +1,126 @@
+import os
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+_TOKEN = re.compile(
+    r"""
+    (?P<string>'(?:[^']|'')*')                       # string literal, '' is an escaped quote
+    | (?P<ident>"(?:[^"]|"")*"|`[^`]*`|\[[^\]]*\])  # quoted identifiers keep their case
+    | (?P<comment>--[^\n]*|/\*.*?\*/)
+    | (?P<space>\s+)
+    | (?P<punct>[(),;=<>!+*/%|-])
+    | (?P<word>[^'"`\[\s(),;=<>!+*/%|-]+)
+    """,
+    re.VERBOSE | re.DOTALL,
+)
+
+
+def canonicalize_sql(query: str) -> str:
+    """Normalize case, whitespace and comments outside literals so trivially different SQL shares a key"""
+    tokens = []
+    pending_space = False
+    for match in _TOKEN.finditer(query):
+        kind = match.lastgroup
+        text = match.group()
+        if kind in ("space", "comment"):
+            pending_space = True
+            continue
+        # Whitespace only matters between two words, never next to punctuation
+        if pending_space and tokens and kind != "punct" and tokens[-1][0] != "punct":
+            tokens.append(("space", " "))
+        pending_space = False
+        tokens.append((kind, text if kind in ("string", "ident") else text.lower()))
+
+    while tokens and tokens[-1] == ("punct", ";"):
+        tokens.pop()
+    return "".join(text for _, text in tokens)
+
+
+def database_version(database: Optional[str]):
+    """Cheap change marker for a SQLite file: mtime and size of the file and of its write-ahead log.
+    In WAL mode writes land in <db>-wal and the main file only changes at a checkpoint"""
+    if database and database.startswith("file:"):
+        database = database[len("file:"):].split("?", 1)[0]
+    if not database or database == ":memory:" or not os.path.exists(database):
+        return None
+    stat = os.stat(database)
+    try:
+        wal = os.stat(f"{database}-wal")
+        wal_version = (wal.st_mtime_ns, wal.st_size)
+    except FileNotFoundError:
+        wal_version = None
+    return (stat.st_mtime_ns, stat.st_size, wal_version)
+
+
+def _result_size(result: Any) -> int:
+    if isinstance(result, str):
+        return len(result)
+    if hasattr(result, "nbytes"):
+        return result.nbytes
+    return sys.getsizeof(result)
+
+
+class SQLResultCache:
+    """Thread-safe LRU cache of query results, bounded by total bytes and expiring after a TTL"""
+
+    def __init__(self, max_bytes: int = 32 * 1024 * 1024, max_entry_bytes: int = 4 * 1024 * 1024, ttl: float = 300):
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0, "bypassed": 0}
+
+    def key(self, query: str, version) -> tuple:
+        return (canonicalize_sql(query), version)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+            result, size, stored_at = entry
+            if time.monotonic() - stored_at > self.ttl:
+                self._remove(key)
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return result
+
+    def put(self, key, result):
+        size = _result_size(result)
+        if size > self.max_entry_bytes:
+            return
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (result, size, time.monotonic())
+            self._bytes += size
+            self._stats["stores"] += 1
+            while self._bytes > self.max_bytes and self._entries:
+                self._remove(next(iter(self._entries)))
+                self._stats["evictions"] += 1
+
+    def record_bypass(self):
+        with self._lock:
+            self._stats["bypassed"] += 1
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[1]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def metrics(self):
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._bytes, "max_bytes": self.max_bytes, **self._stats}
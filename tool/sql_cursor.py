@@ -0,0 +1,146 @@
+import io
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Iterator, Optional
+
+from sqlalchemy import text
+
+from tool.sql_result import SQLResult, _to_python
+
+
+def _strip_terminator(query: str) -> str:
+    return query.strip().rstrip(";").strip()
+
+
+class ResultHandle:
+    """Re-executable reference to a SELECT whose full result is never held in memory"""
+
+    def __init__(self, result_id: str, engine, query: str, columns, batch_size: int = 1000, max_rows: Optional[int] = None):
+        self.result_id = result_id
+        self.engine = engine
+        self.query = _strip_terminator(query)
+        self.columns = list(columns)
+        self.batch_size = batch_size
+        self.max_rows = max_rows
+        self.last_used = time.monotonic()
+
+    def page(self, offset: int = 0, limit: int = 100) -> SQLResult:
+        """Fetch one page by wrapping the query in LIMIT/OFFSET"""
+        self.last_used = time.monotonic()
+        if self.max_rows is not None:
+            limit = max(min(limit, self.max_rows - offset), 0)
+            if limit == 0:
+                # Past the row cap there is nothing more to page through
+                return SQLResult(self.columns, [], truncated=False, result_id=self.result_id)
+        paged = f"SELECT * FROM ({self.query}) LIMIT :limit OFFSET :offset"
+        with self.engine.connect() as connection:
+            cursor = connection.execute(text(paged), {"limit": limit + 1, "offset": offset})
+            rows = cursor.fetchmany(limit + 1)
+        truncated = len(rows) > limit and (self.max_rows is None or offset + limit < self.max_rows)
+        return SQLResult(self.columns, [tuple(row) for row in rows[:limit]], truncated=truncated, result_id=self.result_id)
+
+    def iter_batches(self) -> Iterator[list]:
+        """Yield the rows batch by batch from a single streaming cursor"""
+        self.last_used = time.monotonic()
+        with self.engine.connect() as connection:
+            # Exports are long by design, so they are exempt from the statement timeout
+            cursor = connection.execution_options(stream_results=True, statement_timeout=None).execute(text(self.query))
+            remaining = self.max_rows
+            while remaining is None or remaining > 0:
+                size = self.batch_size if remaining is None else min(self.batch_size, remaining)
+                rows = cursor.fetchmany(size)
+                if not rows:
+                    break
+                if remaining is not None:
+                    remaining -= len(rows)
+                yield [tuple(row) for row in rows]
+
+    def iter_ndjson(self) -> Iterator[bytes]:
+        """Stream every row as one JSON object per line"""
+        for rows in self.iter_batches():
+            lines = [
+                json.dumps({name: _to_python(value) for name, value in zip(self.columns, row)})
+                for row in rows
+            ]
+            yield ("\n".join(lines) + "\n").encode("utf-8")
+
+    def iter_arrow(self) -> Iterator[bytes]:
+        """Stream the rows as an Arrow IPC stream, one record batch per fetch"""
+        import pyarrow as pa
+
+        sink = io.BytesIO()
+        writer = None
+        schema = None
+        for rows in self.iter_batches():
+            columns = [[_to_python(row[i]) for row in rows] for i in range(len(self.columns))]
+            if schema is None:
+                fields = []
+                for name, values in zip(self.columns, columns):
+                    arrow_type = pa.array(values).type
+                    fields.append(pa.field(name, pa.string() if pa.types.is_null(arrow_type) else arrow_type))
+                schema = pa.schema(fields)
+                writer = pa.ipc.new_stream(sink, schema)
+
+            arrays = []
+            for field, values in zip(schema, columns):
+                try:
+                    arrays.append(pa.array(values, type=field.type))
+                except (pa.ArrowInvalid, pa.ArrowTypeError, TypeError):
+                    # SQLite is loosely typed, so later batches may not match the first; coerce them
+                    arrays.append(pa.array(values).cast(field.type, safe=False))
+            writer.write_batch(pa.record_batch(arrays, schema=schema))
+            yield sink.getvalue()
+            sink.seek(0)
+            sink.truncate(0)
+
+        if writer is not None:
+            writer.close()
+            yield sink.getvalue()
+
+
+class ResultHandleRegistry:
+    """Bounded, thread-safe registry of result handles with idle expiry"""
+
+    def __init__(self, max_handles: int = 1000, ttl: float = 3600):
+        self.max_handles = max_handles
+        self.ttl = ttl
+        self._handles = OrderedDict()
+        self._lock = threading.Lock()
+
+    def register(self, handle: ResultHandle):
+        with self._lock:
+            self._handles[handle.result_id] = handle
+            self._handles.move_to_end(handle.result_id)
+            while len(self._handles) > self.max_handles:
+                self._handles.popitem(last=False)
+
+    def get(self, result_id: str) -> Optional[ResultHandle]:
+        with self._lock:
+            handle = self._handles.get(result_id)
+            if handle is None:
+                return None
+            if time.monotonic() - handle.last_used > self.ttl:
+                del self._handles[result_id]
+                return None
+            self._handles.move_to_end(result_id)
+            return handle
+
+    def metrics(self):
+        with self._lock:
+            return {"handles": len(self._handles), "max_handles": self.max_handles}
+
+
+def execute_preview(engine, query: str, preview_rows: int = 50, batch_size: int = 1000, max_rows: Optional[int] = None, execution_options: Optional[dict] = None):
+    """Fetch only the first page of a SELECT and return it with a handle to the rest"""
+    with engine.connect() as connection:
+        cursor = connection.execution_options(stream_results=True, **(execution_options or {})).execute(text(query))
+        columns = list(cursor.keys())
+        rows = cursor.fetchmany(preview_rows + 1)
+    preview = SQLResult(columns, [tuple(row) for row in rows[:preview_rows]], truncated=len(rows) > preview_rows)
+    handle = ResultHandle(preview.result_id, engine, query, columns, batch_size=batch_size, max_rows=max_rows)
+    return preview, handle
+
+
+result_handles = ResultHandleRegistry()
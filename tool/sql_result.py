@@ -0,0 +1,179 @@
+import math
+import re
+import threading
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from sqlalchemy import text
+
+RESULT_ID_PATTERN = re.compile(r"^result_id: ([0-9a-f]{12})$", re.MULTILINE)
+
+
+def _column_array(values: List[Any]):
+    """Pack one column into the tightest NumPy array that holds it, with a dtype label"""
+    present = [v for v in values if v is not None]
+    if present and all(isinstance(v, bool) for v in present) and len(present) == len(values):
+        return np.array(values, dtype=bool), "bool"
+    if present and all(isinstance(v, int) and not isinstance(v, bool) for v in present):
+        if len(present) == len(values):
+            try:
+                return np.array(values, dtype=np.int64), "int64"
+            except OverflowError:
+                pass
+        else:
+            return np.array([math.nan if v is None else v for v in values], dtype=np.float64), "float64"
+    if present and all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in present):
+        return np.array([math.nan if v is None else v for v in values], dtype=np.float64), "float64"
+    if all(isinstance(v, str) for v in present):
+        return np.array(values, dtype=object), "string"
+    return np.array(values, dtype=object), "object"
+
+
+def _to_python(value):
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return bytes(value).hex()
+    if value is not None and not isinstance(value, (str, int, float, bool)):
+        return str(value)
+    return value
+
+
+class SQLResult:
+    """Column-oriented result of a SELECT: names, dtypes and one array per column"""
+
+    def __init__(self, columns: List[str], rows: List[tuple], truncated: bool = False, result_id: Optional[str] = None):
+        self.result_id = result_id or uuid.uuid4().hex[:12]
+        self.columns = list(columns)
+        self.row_count = len(rows)
+        self.truncated = truncated
+        self.arrays = {}
+        self.dtypes = {}
+        for index, name in enumerate(self.columns):
+            array, dtype = _column_array([row[index] for row in rows])
+            self.arrays[name] = array
+            self.dtypes[name] = dtype
+        self._nbytes = None
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory held by the column arrays"""
+        if self._nbytes is None:
+            total = 0
+            for array in self.arrays.values():
+                if array.dtype == object:
+                    total += sum(len(str(v)) for v in array) + array.size * 8
+                else:
+                    total += array.nbytes
+            self._nbytes = total
+        return self._nbytes
+
+    def rows(self, start: int = 0, stop: Optional[int] = None) -> List[list]:
+        """Row-major view of a slice of the result"""
+        stop = self.row_count if stop is None else min(stop, self.row_count)
+        columns = [self.arrays[name][start:stop] for name in self.columns]
+        return [[_to_python(column[i]) for column in columns] for i in range(max(stop - start, 0))]
+
+    def to_dict(self, start: int = 0, stop: Optional[int] = None) -> Dict[str, Any]:
+        """JSON-ready columnar payload for API clients"""
+        stop = self.row_count if stop is None else min(stop, self.row_count)
+        return {
+            "result_id": self.result_id,
+            "columns": self.columns,
+            "dtypes": self.dtypes,
+            "row_count": self.row_count,
+            "truncated": self.truncated,
+            "data": {
+                name: [_to_python(v) for v in self.arrays[name][start:stop]]
+                for name in self.columns
+            },
+        }
+
+    def summary(self, preview_rows: int = 20) -> Dict[str, Any]:
+        """Shape and first rows only; clients page the rest from the results endpoint by result_id"""
+        payload = self.to_dict(0, preview_rows)
+        payload["preview_rows"] = min(preview_rows, self.row_count)
+        return payload
+
+    def to_arrow(self):
+        """Arrow table view of the result (pyarrow imported on demand)"""
+        import pyarrow as pa
+
+        columns = {}
+        for name in self.columns:
+            values = self.arrays[name]
+            try:
+                columns[name] = pa.array(values, from_pandas=True)
+            except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+                # SQLite columns can mix types from row to row; such a column goes out as text
+                values = [_to_python(value) for value in values]
+                columns[name] = pa.array([None if value is None else str(value) for value in values], type=pa.string())
+        return pa.table(columns)
+
+    def to_llm_text(self, max_rows: int = 50) -> str:
+        """Compact pipe-separated preview for the model, with the handle to the full result"""
+        shown = min(max_rows, self.row_count)
+        header = f"result_id: {self.result_id}\n"
+        header += f"rows: {self.row_count}{'+ (more rows available)' if self.truncated else ''}"
+        header += f", columns: {', '.join(f'{name}:{self.dtypes[name]}' for name in self.columns)}\n"
+        lines = [" | ".join(self.columns)]
+        lines += [" | ".join("NULL" if v is None else str(v) for v in row) for row in self.rows(0, shown)]
+        footer = f"\n... {self.row_count - shown} more rows not shown" if shown < self.row_count else ""
+        return header + "\n".join(lines) + footer
+
+    def __str__(self):
+        return self.to_llm_text()
+
+
+def execute_select(engine, query: str, max_rows: int = 10000, execution_options: Optional[dict] = None) -> SQLResult:
+    """Run a SELECT and fetch at most max_rows into a SQLResult"""
+    with engine.connect() as connection:
+        cursor = connection.execution_options(**(execution_options or {})).execute(text(query))
+        columns = list(cursor.keys())
+        rows = cursor.fetchmany(max_rows + 1)
+    truncated = len(rows) > max_rows
+    return SQLResult(columns, [tuple(row) for row in rows[:max_rows]], truncated=truncated)
+
+
+class SQLResultStore:
+    """Bounded, thread-safe registry of recent results so clients can fetch them by id"""
+
+    def __init__(self, max_bytes: int = 128 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._results = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def put(self, result: SQLResult):
+        with self._lock:
+            if result.result_id in self._results:
+                self._results.move_to_end(result.result_id)
+                return
+            self._results[result.result_id] = result
+            self._bytes += result.nbytes
+            while self._bytes > self.max_bytes and len(self._results) > 1:
+                _, evicted = self._results.popitem(last=False)
+                self._bytes -= evicted.nbytes
+
+    def get(self, result_id: str) -> Optional[SQLResult]:
+        with self._lock:
+            result = self._results.get(result_id)
+            if result is not None:
+                self._results.move_to_end(result_id)
+            return result
+
+    def find_in_text(self, content: str) -> Optional[SQLResult]:
+        """Resolve the result referenced by a tool's text output, if any"""
+        match = RESULT_ID_PATTERN.search(content or "")
+        return self.get(match.group(1)) if match else None
+
+    def metrics(self):
+        with self._lock:
+            return {"results": len(self._results), "bytes": self._bytes, "max_bytes": self.max_bytes}
+
+
+sql_result_store = SQLResultStore()
@@ -1,17 +1,33 @@
 from sqlalchemy.engine import Result
 from pydantic import BaseModel, Field
-from typing import Any, Dict, Optional, Sequence, Type, Union
+from typing import Any, Dict, NamedTuple, Optional, Sequence, Type, Union
 from langchain_core.callbacks import (
     AsyncCallbackManagerForToolRun,
     CallbackManagerForToolRun,
 )
-from config import get_llm
+from config import get_llm, get_sql_cache_settings, get_sql_result_settings, get_sql_guard_settings
+from tool.sql_cache import SQLResultCache, database_version
+from tool.sql_result import SQLResult, execute_select, sql_result_store
+from tool.sql_cursor import ResultHandle, execute_preview, result_handles
+from tool.query_limits import QueryLimits, current_query_limits
+from tool.query_planner import QueryCostGuard
 from langchain_community.utilities.sql_database import SQLDatabase
 from langchain_community.agent_toolkits.sql.toolkit import SQLDatabaseToolkit
 from langchain_community.utilities.sql_database import SQLDatabase
 from langchain_core.tools import BaseTool
 from pydantic import BaseModel, Field, root_validator, model_validator, ConfigDict
 
+class _CachedQuery(NamedTuple):
+    """A cached result with the query that actually ran (after any cost-guard rewrite) and its note"""
+
+    result: SQLResult
+    query: str
+    note: str
+
+    @property
+    def nbytes(self) -> int:
+        return self.result.nbytes
+
 class BaseSQLDatabaseTool(BaseModel):
     """Base tool for interacting with a SQL database."""
 
@@ -23,6 +39,7 @@ class BaseSQLDatabaseTool(BaseModel):
 
 class _QuerySQLDatabaseToolInput(BaseModel):
     query: str = Field(..., description="A detailed and correct SQL query.")
+    bypass_cache: bool = Field(False, description="Set to true to force a fresh read instead of a cached result.")
 
 class QuerySQLDatabaseTool(BaseSQLDatabaseTool, BaseTool):
     """Tool for querying a SQL database.
@@ -40,27 +57,160 @@ class QuerySQLDatabaseTool(BaseSQLDatabaseTool, BaseTool):
     If an error is returned, rewrite the query, check the query, and try again.
     """
     args_schema: Type[BaseModel] = _QuerySQLDatabaseToolInput
+    cache: Optional[SQLResultCache] = Field(default=None, exclude=True)
+    max_rows: int = 10000
+    llm_rows: int = 50
+    execution_mode: str = "cursor"
+    batch_size: int = 1000
+    query_timeout: Optional[float] = 15
+    cost_guard: Optional[QueryCostGuard] = Field(default=None, exclude=True)
 
     def _run(
         self,
         query: str,
+        bypass_cache: bool = False,
         run_manager: Optional[CallbackManagerForToolRun] = None,
     ) -> Union[str, Sequence[Dict[str, Any]], Result]:
         """Execute the query, return the results or an error message."""
 
         if not query.strip().lower().startswith("select"):
             return "This tool can only be used to execute SELECT queries. not INSERT, UPDATE, DELETE, or other types of queries."
-    
-        return self.db.run_no_throw(query)
-    
 
+        # Limits come from the request that started this agent run, when there is one
+        limits = current_query_limits.get() or QueryLimits(timeout=self.query_timeout, max_rows=self.max_rows)
+        if limits.cancelled:
+            return "Error: the request was cancelled before this query ran."
+        max_rows = min(self.max_rows, limits.max_rows)
+
+        key = None
+        if self.cache is not None:
+            # Key on the file version too, so any write to the database invalidates old results
+            key = self.cache.key(query, database_version(self.db._engine.url.database))
+            if bypass_cache:
+                self.cache.record_bypass()
+            else:
+                cached = self.cache.get(key)
+                if cached is not None:
+                    result = cached.result
+                    sql_result_store.put(result)
+                    if self.execution_mode == "cursor":
+                        # Paging reruns the query that was executed, so a guard-added LIMIT still applies
+                        result_handles.register(
+                            ResultHandle(result.result_id, self.db._engine, cached.query, result.columns, batch_size=self.batch_size, max_rows=max_rows)
+                        )
+                    preview = result.to_llm_text(self.llm_rows)
+                    return f"{preview}\n{cached.note}" if cached.note else preview
+
+        # Check the plan first so cartesian joins and unbounded scans never reach the data
+        note = ""
+        if self.cost_guard is not None:
+            try:
+                verdict = self.cost_guard.check(self.db._engine, query)
+            except Exception as e:
+                return f"Error: {e}"
+            if verdict.action == "reject":
+                return verdict.message
+            if verdict.action == "rewrite":
+                query, note = verdict.query, verdict.message
+
+        try:
+            if self.execution_mode == "cursor":
+                # Only the preview page is fetched; the rest stays behind a pageable handle
+                result, handle = execute_preview(
+                    self.db._engine, query, preview_rows=self.llm_rows, batch_size=self.batch_size,
+                    max_rows=max_rows, execution_options=limits.execution_options()
+                )
+                result_handles.register(handle)
+            else:
+                result = execute_select(self.db._engine, query, max_rows=max_rows, execution_options=limits.execution_options())
+        except Exception as e:
+            if limits.cancelled:
+                return "Error: the request was cancelled while this query was running."
+            if "interrupted" in str(e):
+                return (
+                    f"Error: the query was stopped after exceeding the {limits.timeout:g}s time limit. "
+                    "Avoid cartesian joins, join on keys, filter early and add a LIMIT, then try again."
+                )
+            # Same contract as run_no_throw: errors go back to the agent as text
+            return f"Error: {e}"
+
+        # The full result stays server-side; the model only sees a compact preview
+        sql_result_store.put(result)
+        if key is not None:
+            self.cache.put(key, _CachedQuery(result, query, note))
+        preview = result.to_llm_text(self.llm_rows)
+        return f"{preview}\n{note}" if note else preview
 
-def get_sql_tools(url = "sqlite:///ecommerce.db"):
-    db = SQLDatabase.from_uri(url)
+
+class _CatalogSchemaToolInput(BaseModel):
+    table_names: str = Field(..., description="A comma-separated list of the table names for which to return the schema. Example input: 'table1, table2, table3'")
+
+class CatalogSchemaTool(BaseTool):
+    """Schema and sample rows served from the precomputed schema catalog."""
+
+    name: str = "sql_db_schema"
+    description: str = "Get the schema, row counts, column statistics and sample rows for the specified SQL tables."
+    args_schema: Type[BaseModel] = _CatalogSchemaToolInput
+    catalog: Any = Field(exclude=True)
+
+    def _run(
+        self,
+        table_names: str,
+        run_manager: Optional[CallbackManagerForToolRun] = None,
+    ) -> str:
+        """Get the schema for tables in a comma-separated list."""
+        return self.catalog.table_info([t.strip() for t in table_names.split(",") if t.strip()])
+
+class _CatalogListTablesToolInput(BaseModel):
+    tool_input: str = Field("", description="An empty string")
+
+class CatalogListTablesTool(BaseTool):
+    """Table names served from the precomputed schema catalog."""
+
+    name: str = "sql_db_list_tables"
+    description: str = "Input is an empty string, output is a comma-separated list of tables in the database."
+    args_schema: Type[BaseModel] = _CatalogListTablesToolInput
+    catalog: Any = Field(exclude=True)
+
+    def _run(
+        self,
+        tool_input: str = "",
+        run_manager: Optional[CallbackManagerForToolRun] = None,
+    ) -> str:
+        """Get a comma-separated list of table names."""
+        return ", ".join(self.catalog.table_names())
+
+
+_settings = get_sql_cache_settings()
+sql_result_cache = SQLResultCache(
+    max_bytes=_settings["max_bytes"],
+    max_entry_bytes=_settings["max_entry_bytes"],
+    ttl=_settings["ttl"],
+)
+
+
+def get_sql_tools(url = "sqlite:///ecommerce.db", engine=None, catalog=None):
+    # A shared engine lets every team reuse the same connection pool
+    db = SQLDatabase(engine) if engine is not None else SQLDatabase.from_uri(url)
     toolkit = SQLDatabaseToolkit(db=db, llm=get_llm())
 
-    Custom_tool=QuerySQLDatabaseTool(db=db, description="Input to this tool is a detailed and correct SQL query, output is a result from the database. If the query is not correct, an error message will be returned. If an error is returned, rewrite the query, check the query, and try again. If you encounter an issue with Unknown column 'xxxx' in 'field list', use sql_db_schema to query the correct table fields.")
+    result_settings = get_sql_result_settings()
+    guard_settings = get_sql_guard_settings()
+    cost_guard = None
+    if guard_settings["enabled"]:
+        cost_guard = QueryCostGuard(
+            large_table_rows=guard_settings["large_table_rows"],
+            max_cost=guard_settings["max_cost"],
+            rewrite_limit=result_settings["max_rows"],
+        )
+    Custom_tool=QuerySQLDatabaseTool(db=db, cache=sql_result_cache, max_rows=result_settings["max_rows"], llm_rows=result_settings["llm_rows"], execution_mode=result_settings["execution_mode"], batch_size=result_settings["batch_size"], query_timeout=result_settings["query_timeout"], cost_guard=cost_guard, description="Input to this tool is a detailed and correct SQL query, output is a result from the database. If the query is not correct, an error message will be returned. If an error is returned, rewrite the query, check the query, and try again. If you encounter an issue with Unknown column 'xxxx' in 'field list', use sql_db_schema to query the correct table fields.")
 
 
     """Get LangChain adapted tools from toolkit"""
-    return [Custom_tool]+ toolkit.get_tools()[1:]
+    if catalog is None:
+        return [Custom_tool]+ toolkit.get_tools()[1:]
+
+    # Schema lookups come from the in-memory catalog instead of re-reflecting the database
+    query_checker = toolkit.get_tools()[3]
+    schema_tool = CatalogSchemaTool(catalog=catalog, description="Input to this tool is a comma-separated list of tables, output is the schema, row counts, column statistics and sample rows for those tables. Be sure that the tables actually exist by calling sql_db_list_tables first! Example Input: table1, table2, table3")
+    return [Custom_tool, schema_tool, CatalogListTablesTool(catalog=catalog), query_checker]
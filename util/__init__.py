@@ -1,5 +1,7 @@
 from .stream_handler import stream_db_conversation
 from .display_helper import display_plot_result
 from .stream_data_anaylisi import run_code_executor_agent
+from .query_cache import QueryCache, replay_events, schema_fingerprint, sqlite_path_from_uri
 
-__all__ = ['stream_db_conversation', 'display_plot_result']
+__all__ = ['stream_db_conversation', 'display_plot_result', 'QueryCache', 'replay_events',
+           'schema_fingerprint', 'sqlite_path_from_uri']
@@ -0,0 +1,148 @@
+import asyncio
+import hashlib
+import re
+import sqlite3
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+
+from tool.sql_cache import database_version
+
+_fingerprints = {}
+
+
+def sqlite_path_from_uri(db_uri: str) -> Path:
+    """Extract the file path from a sqlite:/// SQLAlchemy URI"""
+    path = db_uri.split("sqlite:///", 1)[-1].split("?", 1)[0]
+    return Path(path)
+
+
+def schema_fingerprint(db_path) -> str:
+    """Hash of every CREATE statement in sqlite_master, recomputed only when the file or its WAL changes"""
+    db_path = Path(db_path)
+    key = (str(db_path.resolve()), database_version(str(db_path)))
+    if key in _fingerprints:
+        return _fingerprints[key]
+
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        rows = conn.execute(
+            "SELECT type, name, sql FROM sqlite_master WHERE sql IS NOT NULL ORDER BY type, name"
+        ).fetchall()
+    finally:
+        conn.close()
+
+    digest = hashlib.sha256(repr(rows).encode("utf-8")).hexdigest()[:16]
+    _fingerprints.clear()
+    _fingerprints[key] = digest
+    return digest
+
+
+class QueryCache:
+    """Caches the streamed events of a database conversation by question and schema"""
+
+    def __init__(self, max_entries: int = 512, ttl: float = 3600, embed_fn=None, similarity_threshold: float = 0.95):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.embed_fn = embed_fn
+        self.similarity_threshold = similarity_threshold
+        self._entries = OrderedDict()
+        self._keys = []
+        self._vectors = None
+        self._stats = {"exact_hits": 0, "semantic_hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+
+    @staticmethod
+    def normalize(question: str) -> str:
+        """Lowercase, collapse whitespace and drop trailing punctuation"""
+        question = re.sub(r"\s+", " ", question.strip().lower())
+        return question.rstrip(" ?.!")
+
+    async def _embed(self, text):
+        vector = np.asarray(await asyncio.to_thread(self.embed_fn, text), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _expired(self, entry):
+        return time.monotonic() - entry["stored_at"] > self.ttl
+
+    def _drop(self, key):
+        self._entries.pop(key, None)
+        if key in self._keys:
+            index = self._keys.index(key)
+            self._keys.pop(index)
+            self._vectors = np.delete(self._vectors, index, axis=0)
+
+    async def lookup(self, question: str, fingerprint: str):
+        """Return cached events for the question, or None on a miss"""
+        key = (fingerprint, self.normalize(question))
+        entry = self._entries.get(key)
+        if entry is not None and self._expired(entry):
+            self._drop(key)
+            entry = None
+        if entry is not None:
+            self._entries.move_to_end(key)
+            self._stats["exact_hits"] += 1
+            return entry["events"]
+
+        if self.embed_fn is not None and self._keys:
+            vector = await self._embed(key[1])
+            scores = self._vectors @ vector
+            for index in np.argsort(scores)[::-1]:
+                if scores[index] < self.similarity_threshold:
+                    break
+                candidate = self._keys[index]
+                if candidate[0] != fingerprint:
+                    continue
+                entry = self._entries[candidate]
+                if self._expired(entry):
+                    continue
+                self._entries.move_to_end(candidate)
+                self._stats["semantic_hits"] += 1
+                return entry["events"]
+
+        self._stats["misses"] += 1
+        return None
+
+    async def store(self, question: str, fingerprint: str, events):
+        """Remember the events of a completed conversation"""
+        key = (fingerprint, self.normalize(question))
+        vector = None
+        if self.embed_fn is not None:
+            vector = (await self._embed(key[1]))[np.newaxis, :]
+
+        self._drop(key)
+        self._entries[key] = {"events": list(events), "stored_at": time.monotonic()}
+
+        if vector is not None:
+            self._vectors = vector if self._vectors is None else np.vstack([self._vectors, vector])
+            self._keys.append(key)
+
+        self._stats["stores"] += 1
+        while len(self._entries) > self.max_entries:
+            oldest = next(iter(self._entries))
+            self._drop(oldest)
+            self._stats["evictions"] += 1
+
+    def clear(self):
+        self._entries.clear()
+        self._keys = []
+        self._vectors = None
+
+    def metrics(self):
+        """Hit/miss counters and current size"""
+        hits = self._stats["exact_hits"] + self._stats["semantic_hits"]
+        lookups = hits + self._stats["misses"]
+        return {
+            "entries": len(self._entries),
+            "semantic": self.embed_fn is not None,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            **self._stats,
+        }
+
+
+async def replay_events(events):
+    """Yield cached events in the same order the live conversation produced them"""
+    for event in events:
+        yield event
@@ -29,7 +29,9 @@ async def run_code_executor_agent_streamlit(team, docker, file_name, task="simpl
         An async generator that yields dictionaries with formatted message data
     """
     try:
-        await docker.start()
+        # Pooled executors (docker=None) are started and stopped by their pool
+        if docker is not None:
+            await docker.start()
 
         task = task + f' and the file is {file_name}'
         async for message in team.run_stream(task=task):
@@ -57,7 +59,8 @@ async def run_code_executor_agent_streamlit(team, docker, file_name, task="simpl
             "message": f"An error occurred: {e}"
         }
     finally:
-        await docker.stop()
+        if docker is not None:
+            await docker.stop()
         print("Docker stopped.")
  
 
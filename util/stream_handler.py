@@ -3,6 +3,7 @@ from autogen_agentchat.messages import (
     ToolCallRequestEvent,
     ToolCallExecutionEvent,
 )
+from tool.sql_result import sql_result_store
 
 async def stream_db_conversation(stream_result):
     """
@@ -42,13 +43,20 @@ async def stream_db_conversation(stream_result):
                 if result_item.content:
                     content_preview = result_item.content[:250] + "..." if len(result_item.content) > 250 else result_item.content
                 
-                yield {
+                tool_result = {
                     "type": "tool_result",
                     "tool_name": result_item.name,
                     "content": content_preview,
                     "emoji": "✅",
                     "timestamp": True
                 }
+                # SQL results stay server-side; the stream carries their shape and a preview
+                sql_result = sql_result_store.find_in_text(result_item.content)
+                if sql_result is not None:
+                    tool_result["result_id"] = sql_result.result_id
+                    tool_result["data"] = sql_result.summary()
+                    tool_result["url"] = f"/api/v1/database/results/{sql_result.result_id}"
+                yield tool_result
         else:
             # Other message types
             yield {